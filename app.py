@@ -1,43 +1,150 @@
 """表情符号检查器 - 主应用"""
+import atexit
 import pymysql
 from flask import Flask, render_template, redirect, url_for, g
 from flask_login import LoginManager, current_user
 from config import Config
-from models.user import User
+from models.user import User, user_cache, password_hasher, login_throttle
+from models.course import enrollment_cache
+from models.emoji_record import EmojiRecord, stats_cache
+from models.summary import summary_cache
+from routes.admin import response_cache, export_jobs
+from routes.student import submission_tokens
+from utils.cache import create_backend
+from utils.db_pool import ConnectionPool, PoolExhaustedError
+from utils.passwords import HashingBusyError
+from utils.profiling import Profiler
+from utils.pubsub import PubSub, create_broker
+from utils import metrics
+from utils.write_behind import WriteBehindQueue
 
 # 创建应用
 app = Flask(__name__)
 app.config.from_object(Config)
 
-# 使用 PyMySQL 直接连接
+def create_connection():
+    """建立新的 PyMySQL 连接"""
+    return pymysql.connect(
+        host=app.config['MYSQL_HOST'],
+        user=app.config['MYSQL_USER'],
+        password=app.config['MYSQL_PASSWORD'],
+        database=app.config['MYSQL_DB'],
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+# 数据库连接池（连接按需建立，跨请求、跨线程复用）
+db_pool = ConnectionPool(
+    create_connection,
+    max_size=app.config['MYSQL_POOL_SIZE'],
+    timeout=app.config['MYSQL_POOL_TIMEOUT'],
+    recycle=app.config['MYSQL_POOL_RECYCLE'],
+    ping_interval=app.config['MYSQL_POOL_PING_INTERVAL']
+)
+atexit.register(db_pool.close_all)
+
 def get_db():
-    """获取数据库连接"""
+    """获取数据库连接（从连接池借出，请求结束时归还）"""
     if 'db' not in g:
-        g.db = pymysql.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DB'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        g.db = db_pool.acquire()
     return g.db
 
 @app.teardown_appcontext
 def close_db(e=None):
-    """关闭数据库连接"""
+    """归还数据库连接"""
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        db_pool.release(db)
+
+# 请求剖析（SQL 埋点、模板耗时、Server-Timing、慢查询日志、cProfile 采样）
+profiler = Profiler(app)
 
 # 创建一个与 Flask-MySQLdb 兼容的适配器类
 class MySQLAdapter:
     """兼容 Flask-MySQLdb 的适配器"""
+    def __init__(self, pool, profiler=None):
+        self.pool = pool
+        self.profiler = profiler
+
     @property
     def connection(self):
+        if self.profiler is not None:
+            return self.profiler.wrap(get_db())
         return get_db()
 
+    def pool_stats(self):
+        """连接池统计（使用中、空闲、等待时间等）"""
+        return self.pool.stats()
+
 # 创建适配器实例
-mysql = MySQLAdapter()
+mysql = MySQLAdapter(db_pool, profiler)
+
+# 共享缓存后端（未配置时各缓存仅在进程内生效）
+cache_backend = create_backend(app.config['CACHE_BACKEND_URL'])
+user_cache.backend = cache_backend
+enrollment_cache.backend = cache_backend
+stats_cache.backend = cache_backend
+summary_cache.backend = cache_backend
+login_throttle.cache.backend = cache_backend
+submission_tokens.cache.backend = cache_backend
+
+# 进程退出时关闭密码哈希进程池和后台导出线程
+atexit.register(password_hasher.shutdown)
+atexit.register(export_jobs.shutdown)
+
+# 实时推送（教师统计页通过 SSE 订阅提交计数增量）
+EmojiRecord.live_feed = PubSub(create_broker(app.config['PUBSUB_BROKER_URL']))
+
+def flush_submissions(batch):
+    """后写队列的批量写入函数（在后台线程中运行）"""
+    with app.app_context():
+        EmojiRecord.create_records(mysql, batch)
+
+def describe_submissions(batch):
+    """后写队列丢弃数据时的日志摘要：只记录涉及的课程，不记录用户和提交内容"""
+    return '课程 ' + ', '.join(str(course_id) for course_id in sorted({item[1] for item in batch}))
+
+# 表情提交后写队列（可选）；进程退出时先写完队列再关闭连接池
+if app.config['EMOJI_WRITE_BEHIND']:
+    EmojiRecord.submission_queue = WriteBehindQueue(
+        flush_submissions,
+        max_size=app.config['SUBMISSION_QUEUE_SIZE'],
+        batch_size=app.config['SUBMISSION_FLUSH_SIZE'],
+        flush_interval=app.config['SUBMISSION_FLUSH_INTERVAL'],
+        describe=describe_submissions
+    )
+    EmojiRecord.submission_queue.start()
+    atexit.register(EmojiRecord.submission_queue.stop)
+
+# Prometheus 指标（/metrics）
+metrics.init_app(app)
+profiler.query_listeners.append(metrics.observe_query)
+metrics.registry.gauge('db_pool_connections', '数据库连接池连接数',
+                       lambda: {(state,): db_pool.stats()[state] for state in ('in_use', 'idle')}, ('state',))
+metrics.registry.gauge('db_pool_wait_seconds_total', '等待数据库连接的累计时间',
+                       lambda: db_pool.stats()['wait_time_total'], type='counter')
+metrics.registry.gauge('db_pool_timeouts_total', '等待数据库连接超时次数',
+                       lambda: db_pool.stats()['timeouts'], type='counter')
+# 各缓存的命中统计
+caches = {'user': user_cache, 'enrollment': enrollment_cache, 'stats': stats_cache, 'summary': summary_cache, 'response': response_cache}
+metrics.registry.gauge('cache_requests_total', '缓存查询次数',
+                       lambda: {(name, result): cache.stats()[result]
+                                for name, cache in caches.items()
+                                for result in ('hits', 'misses')}, ('cache', 'result'), type='counter')
+metrics.registry.gauge('cache_hit_ratio', '缓存命中率',
+                       lambda: {(name,): cache.stats()['hit_ratio'] for name, cache in caches.items()}, ('cache',))
+metrics.registry.gauge('password_hash_pending', '计算中和排队中的密码哈希任务数',
+                       lambda: password_hasher.stats()['pending'])
+metrics.registry.gauge('password_hash_rejected_total', '等待哈希名额超时次数',
+                       lambda: password_hasher.stats()['rejected'], type='counter')
+metrics.registry.gauge('export_jobs', '后台导出任务数',
+                       lambda: {(state,): count for state, count in export_jobs.stats().items()}, ('state',))
+metrics.registry.gauge('live_feed_subscribers', '实时推送订阅连接数',
+                       lambda: EmojiRecord.live_feed.subscriber_count())
+if EmojiRecord.submission_queue is not None:
+    metrics.registry.gauge('submission_queue_depth', '后写队列中待写入的提交数',
+                           lambda: EmojiRecord.submission_queue.stats()['depth'])
+    metrics.registry.gauge('submission_flush_seconds_avg', '后写队列平均批量写入耗时',
+                           lambda: EmojiRecord.submission_queue.stats()['flush_time_avg'])
 
 # 初始化登录管理
 login_manager = LoginManager()
@@ -47,8 +154,8 @@ login_manager.login_message = '请先登录'
 
 @login_manager.user_loader
 def load_user(user_id):
-    """加载用户"""
-    return User.get_by_id(mysql, int(user_id))
+    """加载用户（带缓存，避免每个请求都查询数据库）"""
+    return User.get_cached(mysql, int(user_id))
 
 # 导入并注册路由
 from routes.auth import init_auth_routes
@@ -80,5 +187,12 @@ def internal_server_error(e):
     """500错误处理"""
     return render_template('error.html', error_code=500, error_message='服务器内部错误'), 500
 
+@app.errorhandler(PoolExhaustedError)
+@app.errorhandler(HashingBusyError)
+def pool_exhausted(e):
+    """数据库连接池或密码哈希进程池耗尽时返回503，提示客户端稍后重试"""
+    # 不渲染 base.html：加载 current_user 需要再次借用连接
+    return '503 服务器繁忙，请稍后重试', 503, {'Retry-After': '1', 'Content-Type': 'text/plain; charset=utf-8'}
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""负载测试脚本
+
+模拟课堂场景的请求流量（学生登录、集中提交表情、查看历史；教师轮询主页、统计、图表和导出），
+统计各接口的 p50/p95/p99 延迟与吞吐量，结果保存为 JSON 以便对比不同版本：
+
+    python benchmarks/load_test.py                               # 进程内 Flask 测试客户端
+    python benchmarks/load_test.py --url http://localhost:5000   # 压测已启动的服务
+    python benchmarks/load_test.py --compare benchmarks/results/load_xxx.json
+
+账号使用 seed_data.py 生成的 bench_s<序号> / bench_t<序号>（密码 bench123）。
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+PASSWORD = 'bench123'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+_COURSE_OPTION = re.compile(r'<option value="(\d+)">')
+
+
+class TestClientSession:
+    """基于 Flask 测试客户端的会话（不经过网络，测量应用本身的开销）"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self._client.open(path, method=method, data=data)
+        body = response.get_data()
+        return response.status_code, body
+
+
+class HttpSession:
+    """基于 urllib 的 HTTP 会话（保留 Cookie，不跟随重定向）"""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode('utf-8') if data else None
+        req = urllib.request.Request(self._base_url + path, data=body, method=method)
+        try:
+            with self._opener.open(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Recorder:
+    """按接口收集请求延迟"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._errors = {}
+
+    def timed(self, session, label, method, path, data=None):
+        start = time.perf_counter()
+        try:
+            status, body = session.request(method, path, data)
+        except Exception:
+            status, body = 599, b''
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.setdefault(label, []).append(elapsed)
+            if status >= 400:
+                self._errors[label] = self._errors.get(label, 0) + 1
+        return status, body
+
+    def summary(self, duration):
+        def percentile(values, p):
+            # 最近秩法
+            return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+        result = {}
+        with self._lock:
+            for label, values in sorted(self._latencies.items()):
+                values = sorted(values)
+                result[label] = {
+                    'count': len(values),
+                    'errors': self._errors.get(label, 0),
+                    'throughput': round(len(values) / duration, 2),
+                    'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                    'p50_ms': round(percentile(values, 50) * 1000, 2),
+                    'p95_ms': round(percentile(values, 95) * 1000, 2),
+                    'p99_ms': round(percentile(values, 99) * 1000, 2),
+                    'max_ms': round(values[-1] * 1000, 2),
+                }
+        return result
+
+
+def student_scenario(session, recorder, rng, index, deadline, burst):
+    """学生：登录 → 打开提交页 → 连续提交表情 → 查看历史"""
+    recorder.timed(session, 'auth.login', 'POST', '/login',
+                   {'username': f'bench_s{index}', 'password': PASSWORD})
+    while time.monotonic() < deadline:
+        _, body = recorder.timed(session, 'student.send_emoji[GET]', 'GET', '/student/send_emoji')
+        course_ids = _COURSE_OPTION.findall(body.decode('utf-8', 'ignore'))
+        if not course_ids:
+            return
+        for _ in range(burst):
+            recorder.timed(session, 'student.send_emoji[POST]', 'POST', '/student/send_emoji',
+                           {'course_id': rng.choice(course_ids), 'emoji': rng.choice(Config.EMOJI_LIST)})
+        recorder.timed(session, 'student.history', 'GET', '/student/history')
+        time.sleep(rng.uniform(0.5, 2.0))
+
+
+def teacher_scenario(session, recorder, rng, index, deadline, export_every):
+    """教师：登录 → 轮询主页、统计页和图表接口，定期导出"""
+    recorder.timed(session, 'auth.login', 'POST', '/login',
+                   {'username': f'bench_t{index}', 'password': PASSWORD})
+    polls = 0
+    while time.monotonic() < deadline:
+        recorder.timed(session, 'admin.dashboard', 'GET', '/admin/dashboard')
+        days = rng.choice([7, 30, 90])
+        recorder.timed(session, 'admin.statistics', 'GET', f'/admin/statistics?days={days}')
+        recorder.timed(session, 'admin.api_chart_data', 'GET', f'/admin/api/chart_data?days={days}')
+        polls += 1
+        if export_every and polls % export_every == 0:
+            recorder.timed(session, 'admin.export', 'GET', '/admin/export?days=7&format=csv')
+        time.sleep(rng.uniform(1.0, 3.0))
+
+
+def run(args):
+    if args.url:
+        make_session = lambda: HttpSession(args.url)
+    else:
+        from app import app
+        make_session = lambda: TestClientSession(app)
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = []
+    for i in range(args.students):
+        rng = random.Random(args.seed + i)
+        threads.append(threading.Thread(target=student_scenario, args=(
+            make_session(), recorder, rng, rng.randrange(args.student_pool), deadline, args.burst)))
+    for i in range(args.teachers):
+        rng = random.Random(args.seed + 10000 + i)
+        threads.append(threading.Thread(target=teacher_scenario, args=(
+            make_session(), recorder, rng, rng.randrange(args.teacher_pool), deadline, args.export_every)))
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - started
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'target': args.url or 'test_client',
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'duration': round(duration, 2),
+        'endpoints': recorder.summary(duration),
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"\n{'接口':32} {'请求数':>8} {'错误':>6} {'吞吐/s':>9} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9}")
+    for label, stats in result['endpoints'].items():
+        line = (f"{label:32} {stats['count']:>8} {stats['errors']:>6} {stats['throughput']:>9} "
+                f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+        base = (baseline or {}).get('endpoints', {}).get(label)
+        if base and base['p95_ms']:
+            line += f"  p95 {(stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='负载测试')
+    parser.add_argument('--url', help='被测服务地址；不指定时使用进程内测试客户端')
+    parser.add_argument('--duration', type=float, default=30, help='持续时间（秒）')
+    parser.add_argument('--students', type=int, default=50, help='并发学生数')
+    parser.add_argument('--teachers', type=int, default=5, help='并发教师数')
+    parser.add_argument('--student-pool', type=int, default=5000, help='可用学生账号数（bench_s0..）')
+    parser.add_argument('--teacher-pool', type=int, default=100, help='可用教师账号数（bench_t0..）')
+    parser.add_argument('--burst', type=int, default=3, help='每轮连续提交的表情数')
+    parser.add_argument('--export-every', type=int, default=10, help='教师每轮询多少次导出一次（0 为不导出）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='结果文件路径（默认 benchmarks/results/load_<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果文件对比 p95')
+    args = parser.parse_args()
+
+    result = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f'\n结果已保存: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""记录列表结果整理的微基准
+
+比较两种生成 time_formatted 的方式在客户端（驱动解码 + Python 处理）上的开销：
+
+- loop: 驱动把 session_time 解码为 timedelta，构造行字典后再逐行计算并补充 time_formatted（旧实现）
+- sql:  以 TIME_FORMAT 在数据库中生成 time_formatted 代替 session_time 列，驱动一次构造完整的行字典（当前实现）
+
+不需要数据库：按 PyMySQL 读取结果集的方式（逐列 decode + 转换函数，DictCursor 以 zip 构造字典）
+解码模拟的列值，测量每行 CPU 时间和结果集占用的内存：
+
+    python benchmarks/record_shaping.py --rows 100000
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from pymysql import converters
+from pymysql.constants import FIELD_TYPE
+
+# 旧实现中 get_all_records 返回的列（er.* + 课程名称、代码）及其类型
+LOOP_COLUMNS = [
+    ('id', FIELD_TYPE.LONG),
+    ('course_id', FIELD_TYPE.LONG),
+    ('emoji', FIELD_TYPE.VAR_STRING),
+    ('emoji_name', FIELD_TYPE.VAR_STRING),
+    ('session_date', FIELD_TYPE.DATE),
+    ('session_time', FIELD_TYPE.TIME),
+    ('comment', FIELD_TYPE.BLOB),
+    ('created_at', FIELD_TYPE.DATETIME),
+    ('course_name', FIELD_TYPE.VAR_STRING),
+    ('course_code', FIELD_TYPE.VAR_STRING),
+]
+
+# 当前实现返回的列（EmojiRecord.RECORD_COLUMNS + 课程名称、代码）
+SQL_COLUMNS = [('time_formatted', FIELD_TYPE.VAR_STRING) if name == 'session_time' else (name, field_type)
+               for name, field_type in LOOP_COLUMNS]
+
+EMOJIS = [('😊', '开心'), ('😐', '一般'), ('😕', '困惑'), ('🤔', '思考')]
+
+
+def wire_rows(count, seed=1):
+    """生成结果集的原始列值（与 MySQL 文本协议中的取值一致，TIME 与 TIME_FORMAT 结果的文本相同）"""
+    rng = random.Random(seed)
+    rows = []
+    start = datetime(2024, 9, 1, 8, 0, 0)
+    for i in range(count):
+        emoji, name = rng.choice(EMOJIS)
+        seconds = rng.randrange(8 * 3600, 18 * 3600)
+        session_time = f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+        row = [str(i + 1), str(rng.randrange(1, 300)), emoji, name,
+               str(date(2024, 9, 1) + timedelta(days=rng.randrange(120))), session_time,
+               'comment' if rng.random() < 0.2 else None,
+               str(start + timedelta(seconds=i)), f'课程{rng.randrange(300)}', f'C{rng.randrange(300):03d}']
+        rows.append([value.encode('utf-8') if value is not None else None for value in row])
+    return rows
+
+
+def decode_rows(raw_rows, columns):
+    """按 PyMySQL 的方式解码结果集：逐列 decode 并调用类型转换函数，再构造行字典"""
+    fields = [name for name, _ in columns]
+    convs = [converters.decoders.get(field_type) for _, field_type in columns]
+    records = []
+    for raw in raw_rows:
+        values = []
+        for data, conv in zip(raw, convs):
+            if data is not None:
+                data = data.decode('utf-8')
+                if conv is not None:
+                    data = conv(data)
+            values.append(data)
+        records.append(dict(zip(fields, values)))
+    return records
+
+
+def shape_loop(raw_rows):
+    """旧实现：解码后逐行补充 time_formatted"""
+    records = decode_rows(raw_rows, LOOP_COLUMNS)
+    for record in records:
+        if record['session_time'] and hasattr(record['session_time'], 'seconds'):
+            hours = record['session_time'].seconds // 3600
+            minutes = (record['session_time'].seconds // 60) % 60
+            seconds = record['session_time'].seconds % 60
+            record['time_formatted'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        else:
+            record['time_formatted'] = ""
+    return records
+
+
+def shape_sql(raw_rows):
+    """当前实现：time_formatted 作为普通字符串列解码，没有 timedelta 和逐行处理"""
+    return decode_rows(raw_rows, SQL_COLUMNS)
+
+
+def measure(shape, raw_rows, repeat):
+    """返回 (每行耗时微秒, 结果集占用字节)，耗时取多次运行的最小值"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        shape(raw_rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    records = shape(raw_rows)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return best * 1e6 / len(raw_rows), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='记录列表结果整理微基准')
+    parser.add_argument('--rows', type=int, default=100000, help='结果集行数')
+    parser.add_argument('--repeat', type=int, default=5, help='计时重复次数')
+    args = parser.parse_args()
+
+    raw_rows = wire_rows(args.rows)
+    results = {}
+    for name, shape in (('loop', shape_loop), ('sql', shape_sql)):
+        results[name] = measure(shape, raw_rows, args.repeat)
+        per_row_us, size = results[name]
+        print(f'{name:>5}: {per_row_us:6.2f} us/行  {size / args.rows:7.1f} B/行  '
+              f'（{args.rows} 行共 {size / 1024 / 1024:.1f} MB）')
+
+    loop_us, loop_size = results['loop']
+    sql_us, sql_size = results['sql']
+    print(f'CPU 降低 {(1 - sql_us / loop_us) * 100:.1f}%，内存降低 {(1 - sql_size / loop_size) * 100:.1f}%')
+    if sql_us >= loop_us or sql_size >= loop_size:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""基准测试数据生成脚本
+
+向数据库批量写入模拟数据（学生、教师、课程、选课、表情记录），用于压测与查询计划分析：
+
+    python benchmarks/seed_data.py --students 5000 --courses 300 --records 10000000
+
+生成的账号用户名为 bench_s<序号>（学生）、bench_t<序号>（教师），密码均为 bench123。
+表情记录通过 EmojiRecord.create_records 按批写入（每批一个事务），日汇总表同步更新。
+请在测试库上运行（--database 指定库名，默认使用 config.py 中的 MYSQL_DB）。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from config import Config
+from models.emoji_record import EmojiRecord
+from models.user import User
+
+PASSWORD = 'bench123'
+
+# 表情出现的相对权重（课堂上“开心/一般/思考”远多于“生气”）
+EMOJI_WEIGHTS = {'😊': 30, '😐': 20, '🤔': 18, '😕': 12, '😃': 10, '😴': 6, '😢': 2, '😡': 2}
+
+# 上课时间段（开始小时, 分钟）
+CLASS_SLOTS = [(8, 0), (10, 0), (14, 0), (16, 0), (19, 0)]
+
+
+def insert_rows(cursor, sql_prefix, rows, columns):
+    """多行 INSERT"""
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * columns) + ")"] * len(rows))
+    cursor.execute(f"{sql_prefix} VALUES {placeholders}", [value for row in rows for value in row])
+
+
+def seed_users(conn, role, prefix, count, batch_size):
+    """批量创建用户，返回用户ID列表"""
+    password_hash = User.hash_password(PASSWORD)
+    with conn.cursor() as cursor:
+        for offset in range(0, count, batch_size):
+            rows = [(f'{prefix}{i}', password_hash, role, f'{prefix}{i}', f'{prefix}{i}@bench.local')
+                    for i in range(offset, min(offset + batch_size, count))]
+            insert_rows(cursor, "INSERT IGNORE INTO users (username, password_hash, role, full_name, email)", rows, 5)
+        conn.commit()
+        cursor.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id", (prefix + '%',))
+        return [row['id'] for row in cursor.fetchall()]
+
+
+def seed_courses(conn, teacher_ids, count, batch_size):
+    """批量创建课程，返回课程ID列表"""
+    with conn.cursor() as cursor:
+        for offset in range(0, count, batch_size):
+            rows = [(f'压测课程{i}', f'BENCH{i:05d}', teacher_ids[i % len(teacher_ids)], '2024春季')
+                    for i in range(offset, min(offset + batch_size, count))]
+            insert_rows(cursor, "INSERT IGNORE INTO courses (course_name, course_code, teacher_id, semester)", rows, 4)
+        conn.commit()
+        cursor.execute("SELECT id FROM courses WHERE course_code LIKE %s ORDER BY id", ('BENCH%',))
+        return [row['id'] for row in cursor.fetchall()]
+
+
+def seed_enrollments(conn, rng, student_ids, course_ids, per_student, batch_size):
+    """批量选课，返回 {学生ID: [课程ID]}"""
+    enrollments = {user_id: rng.sample(course_ids, min(per_student, len(course_ids))) for user_id in student_ids}
+    rows = [(user_id, course_id) for user_id, courses in enrollments.items() for course_id in courses]
+    with conn.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            insert_rows(cursor, "INSERT IGNORE INTO user_courses (user_id, course_id)", rows[offset:offset + batch_size], 2)
+        conn.commit()
+    return enrollments
+
+
+def seed_records(conn, rng, enrollments, count, days, batch_size):
+    """批量写入表情记录（按上课时间段集中分布在工作日）"""
+    mysql = SimpleNamespace(connection=conn)
+    students = list(enrollments)
+    emojis = list(EMOJI_WEIGHTS)
+    weights = list(EMOJI_WEIGHTS.values())
+    today = date.today()
+    weekdays = [today - timedelta(days=d) for d in range(days) if (today - timedelta(days=d)).weekday() < 5]
+
+    started = time.monotonic()
+    written = 0
+    while written < count:
+        batch = []
+        for _ in range(min(batch_size, count - written)):
+            user_id = rng.choice(students)
+            emoji = rng.choices(emojis, weights)[0]
+            hour, minute = rng.choice(CLASS_SLOTS)
+            offset = rng.randrange(100 * 60)
+            session_time = dtime(hour + (minute * 60 + offset) // 3600, (minute * 60 + offset) // 60 % 60, offset % 60)
+            batch.append((user_id, rng.choice(enrollments[user_id]), emoji, Config.EMOJI_NAMES[emoji],
+                          rng.choice(weekdays), session_time, None))
+        EmojiRecord.create_records(mysql, batch)
+        written += len(batch)
+        elapsed = time.monotonic() - started
+        print(f'\r  表情记录 {written}/{count}（{written / elapsed:.0f} 条/秒）', end='', flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成基准测试数据')
+    parser.add_argument('--database', default=Config.MYSQL_DB, help='目标数据库')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--teachers', type=int, default=100)
+    parser.add_argument('--courses', type=int, default=300)
+    parser.add_argument('--courses-per-student', type=int, default=5)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=180, help='记录分布的天数')
+    parser.add_argument('--batch', type=int, default=2000, help='每个事务写入的行数')
+    parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = pymysql.connect(
+        host=Config.MYSQL_HOST,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        database=args.database,
+        cursorclass=pymysql.cursors.DictCursor,
+        charset='utf8mb4'
+    )
+    try:
+        print(f'写入数据库 {args.database}')
+        teacher_ids = seed_users(conn, 'teacher', 'bench_t', args.teachers, args.batch)
+        print(f'  教师 {len(teacher_ids)}')
+        student_ids = seed_users(conn, 'student', 'bench_s', args.students, args.batch)
+        print(f'  学生 {len(student_ids)}')
+        course_ids = seed_courses(conn, teacher_ids, args.courses, args.batch)
+        print(f'  课程 {len(course_ids)}')
+        enrollments = seed_enrollments(conn, rng, student_ids, course_ids, args.courses_per_student, args.batch)
+        print(f'  选课 {sum(len(c) for c in enrollments.values())}')
+        seed_records(conn, rng, enrollments, args.records, args.days, args.batch)
+    finally:
+        conn.close()
+    print('完成')
+
+
+if __name__ == '__main__':
+    main()
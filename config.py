@@ -14,6 +14,76 @@ class Config:
     MYSQL_DB = os.environ.get('MYSQL_DB') or 'emoji_checker_db'
     MYSQL_CURSORCLASS = 'DictCursor'
     
+    # 数据库连接池配置
+    MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE') or 10)          # 最大连接数
+    MYSQL_POOL_TIMEOUT = float(os.environ.get('MYSQL_POOL_TIMEOUT') or 5)   # 等待空闲连接的超时（秒）
+    MYSQL_POOL_RECYCLE = int(os.environ.get('MYSQL_POOL_RECYCLE') or 3600)  # 连接最长存活时间（秒）
+    MYSQL_POOL_PING_INTERVAL = int(os.environ.get('MYSQL_POOL_PING_INTERVAL') or 30)  # 空闲超过该秒数借出前 ping
+    
+    # 缓存配置
+    CACHE_BACKEND_URL = os.environ.get('CACHE_BACKEND_URL')  # 共享缓存，如 redis://localhost:6379/0 或 local://
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 2048)  # 缓存的用户对象数量上限
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)     # 用户对象缓存时间（秒）
+    ENROLLMENT_CACHE_SIZE = int(os.environ.get('ENROLLMENT_CACHE_SIZE') or 4096)  # 缓存选课索引的学生数量上限
+    ENROLLMENT_CACHE_TTL = int(os.environ.get('ENROLLMENT_CACHE_TTL') or 600)     # 选课索引缓存时间（秒）
+    STATS_CACHE_SIZE = int(os.environ.get('STATS_CACHE_SIZE') or 512)  # 缓存的统计结果数量上限
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL') or 60)     # 统计结果缓存时间（秒）
+    SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL') or 30)  # 管理主页系统概况缓存时间（秒）
+    
+    # 密码哈希配置
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'  # 变更后用户下次登录时自动重新哈希
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)  # 哈希进程数（0 为在请求线程中计算；大于 0 时应由 WSGI 服务器加载 app:app）
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 32)  # 同时计算和排队的哈希任务上限
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)      # 等待哈希名额的最长时间（秒）
+    LOGIN_MAX_FAILURES = int(os.environ.get('LOGIN_MAX_FAILURES') or 5)        # 同一用户名允许的连续登录失败次数
+    LOGIN_LOCKOUT_SECONDS = int(os.environ.get('LOGIN_LOCKOUT_SECONDS') or 300)  # 超出后锁定时间（秒）
+    
+    # 表情提交后写队列配置（默认关闭，开启后提交先入队再由后台线程批量写库）
+    EMOJI_WRITE_BEHIND = os.environ.get('EMOJI_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+    SUBMISSION_QUEUE_SIZE = int(os.environ.get('SUBMISSION_QUEUE_SIZE') or 10000)        # 队列容量
+    SUBMISSION_FLUSH_SIZE = int(os.environ.get('SUBMISSION_FLUSH_SIZE') or 200)          # 每批最多写入条数
+    SUBMISSION_FLUSH_INTERVAL = float(os.environ.get('SUBMISSION_FLUSH_INTERVAL') or 0.5)  # 最长写入间隔（秒）
+    
+    # 表情表单提交令牌配置（吸收重复点击和浏览器重试）
+    SUBMISSION_TOKEN_CACHE_SIZE = int(os.environ.get('SUBMISSION_TOKEN_CACHE_SIZE') or 10000)  # 进程内保存的令牌数量上限
+    SUBMISSION_TOKEN_TTL = int(os.environ.get('SUBMISSION_TOKEN_TTL') or 3600)                 # 令牌及提交结果保存时间（秒）
+    
+    # 批量提交接口配置（教室平板、离线客户端同步）
+    BATCH_SUBMIT_MAX = int(os.environ.get('BATCH_SUBMIT_MAX') or 500)          # 每次请求最多提交条数
+    BATCH_MAX_AGE_DAYS = int(os.environ.get('BATCH_MAX_AGE_DAYS') or 30)       # 客户端时间最早可追溯的天数
+    BATCH_CLOCK_SKEW = int(os.environ.get('BATCH_CLOCK_SKEW') or 300)          # 允许客户端时钟超前的秒数
+    
+    # 性能剖析配置
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 200)  # 慢查询日志阈值（毫秒）
+    SERVER_TIMING = (os.environ['SERVER_TIMING'].lower() in ('1', 'true', 'yes')
+                     if os.environ.get('SERVER_TIMING') else None)  # 输出 Server-Timing 响应头，默认仅调试模式
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0)  # cProfile 采样比例（0 为关闭）
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or 'profiles'                # cProfile 结果目录
+    
+    # 监控指标配置
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # 设置后 /metrics 需携带 Authorization: Bearer <token>
+    
+    # 响应缓存配置（统计页面与图表数据，按 ETag 存储）
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE') or 256)
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 5)  # 秒
+    
+    # 实时推送配置
+    PUBSUB_BROKER_URL = os.environ.get('PUBSUB_BROKER_URL')  # 多进程部署时的消息代理，如 redis://localhost:6379/0
+    LIVE_FEED_KEEPALIVE = float(os.environ.get('LIVE_FEED_KEEPALIVE') or 15)  # SSE 心跳间隔（秒）
+    
+    # 后台导出配置
+    EXPORT_SPOOL_DIR = os.environ.get('EXPORT_SPOOL_DIR') or 'exports'               # 导出文件暂存目录
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS') or 2)                      # 导出线程数
+    EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL') or 3600)                   # 导出文件保存时间（秒）
+    EXPORT_SPOOL_MAX_BYTES = int(os.environ.get('EXPORT_SPOOL_MAX_BYTES') or 1024 ** 3)  # 暂存目录空间上限（字节）
+    
+    # 名单导入配置
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 500)  # 每个事务导入的行数
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 20 * 1024 * 1024)  # 上传文件大小上限（字节）
+    
+    # 分页配置
+    RECORDS_PER_PAGE = int(os.environ.get('RECORDS_PER_PAGE') or 50)
+    
     # Session 配置
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
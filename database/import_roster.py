@@ -0,0 +1,63 @@
+"""批量导入用户与选课名单的脚本
+
+    python database/import_roster.py roster.csv
+    python database/import_roster.py roster.xlsx --report errors.csv --workers 8
+
+名单格式见 /admin/import_roster 页面说明。每 --chunk-size 行在一个事务中提交，
+中途失败时已提交的块不会回滚；已存在的用户和选课会被跳过，可直接重新导入。
+"""
+import argparse
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models.roster import RosterImport
+from models.user import password_hasher
+from utils.roster import iter_roster
+
+
+def write_report(path, errors):
+    """写出逐行错误报告（CSV，带 BOM 便于 Excel 打开）"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['行号', '用户名', '错误'])
+        for error in sorted(errors, key=lambda error: error['line']):
+            writer.writerow([error['line'], error['username'], error['error']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量导入用户与选课名单')
+    parser.add_argument('file', help='名单文件（CSV 或 XLSX）')
+    parser.add_argument('--report', default=None, help='错误报告输出路径（CSV）')
+    parser.add_argument('--chunk-size', type=int, default=Config.IMPORT_CHUNK_SIZE, help='每个事务导入的行数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='密码哈希进程数')
+    args = parser.parse_args()
+
+    # 在 main 中才导入应用：哈希工作进程会以 __mp_main__ 重新导入本脚本，不应再创建一次应用
+    from app import app, mysql
+
+    password_hasher.workers = args.workers
+    try:
+        with open(args.file, 'rb') as f, app.app_context():
+            result = RosterImport.run(mysql, iter_roster(f, args.file), chunk_size=args.chunk_size)
+    finally:
+        password_hasher.shutdown()
+
+    print(f"导入完成：共 {result['total']} 行，新建 {result['created']} 个用户，"
+          f"更新 {result['updated']} 个用户，新增 {result['enrolled']} 条选课，"
+          f"{len(result['errors'])} 行出错")
+    if result['errors']:
+        if args.report:
+            write_report(args.report, result['errors'])
+            print(f'错误报告已写入 {args.report}')
+        else:
+            for error in sorted(result['errors'], key=lambda error: error['line']):
+                print(f"  第 {error['line']} 行 {error['username']}: {error['error']}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
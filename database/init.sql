@@ -57,11 +57,24 @@ CREATE TABLE IF NOT EXISTS emoji_records (
     comment TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
-    INDEX idx_course (course_id),
-    INDEX idx_date (session_date),
+    INDEX idx_course_date_time (course_id, session_date, session_time),
+    INDEX idx_date_time (session_date, session_time),
+    INDEX idx_course_id (course_id, id),
     INDEX idx_emoji (emoji)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- 表情日汇总表（按课程、日期、表情预聚合，随每次提交增量更新）
+CREATE TABLE IF NOT EXISTS emoji_daily_stats (
+    course_id INT NOT NULL,
+    session_date DATE NOT NULL,
+    emoji VARCHAR(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,  -- 二进制比较，区分不同表情
+    emoji_name VARCHAR(50),
+    count INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_id, session_date, emoji),
+    FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+    INDEX idx_date_emoji (session_date, emoji, count)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 用户表情记录关联表（用于用户查看自己的历史记录）
 CREATE TABLE IF NOT EXISTS user_emoji_records (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -69,10 +82,45 @@ CREATE TABLE IF NOT EXISTS user_emoji_records (
     emoji_record_id INT NOT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (emoji_record_id) REFERENCES emoji_records(id) ON DELETE CASCADE,
-    INDEX idx_user (user_id),
+    INDEX idx_user_record (user_id, emoji_record_id),
     INDEX idx_record (emoji_record_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- 批量提交幂等键表（客户端为每条提交生成，重复同步时据此去重）
+CREATE TABLE IF NOT EXISTS emoji_submission_keys (
+    user_id INT NOT NULL,
+    client_key VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, client_key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 全局数据版本号表（只增不减；汇总重建次数和课程列表版本，用于 HTTP 条件请求）
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO data_versions (name, version) VALUES ('emoji', 1), ('courses', 1);
+
+-- 数据库迁移记录表（database/migrations 中的迁移已包含在上面的表结构中）
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO schema_migrations (version, name) VALUES
+('001', 'emoji_daily_stats'),
+('002', 'covering_indexes'),
+('003', 'emoji_data_versions'),
+('004', 'emoji_submission_keys'),
+('005', 'data_versions'),
+('006', 'emoji_daily_stats_binary_emoji'),
+('007', 'derived_data_versions');
+
 -- 插入默认管理员账号
 -- 密码: admin123 (使用 Werkzeug 加密)
 INSERT INTO users (username, password_hash, role, full_name, email) VALUES
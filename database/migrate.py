@@ -0,0 +1,49 @@
+"""数据库迁移脚本
+
+升级已有数据库时运行（init.sql 会删除整个数据库，只用于全新部署）：
+
+    python database/migrate.py            # 执行所有未执行的迁移
+    python database/migrate.py --status   # 查看迁移状态
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from config import Config
+from utils.migrations import applied_versions, load_migrations, migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='执行数据库迁移')
+    parser.add_argument('--status', action='store_true', help='只显示迁移状态，不执行')
+    args = parser.parse_args()
+
+    conn = pymysql.connect(
+        host=Config.MYSQL_HOST,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        database=Config.MYSQL_DB,
+        cursorclass=pymysql.cursors.DictCursor
+    )
+    try:
+        if args.status:
+            applied = applied_versions(conn)
+            for version, name, _ in load_migrations():
+                status = '已执行' if version in applied else '未执行'
+                print(f'{version}_{name}: {status}')
+            return
+
+        done = migrate(conn)
+        if done:
+            print(f'完成，共执行 {len(done)} 个迁移')
+        else:
+            print('数据库已是最新版本')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
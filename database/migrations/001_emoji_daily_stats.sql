@@ -0,0 +1,12 @@
+-- 表情日汇总表（按课程、日期、表情预聚合，随每次提交增量更新）
+-- 执行后运行 python database/rebuild_rollups.py 回填历史数据
+CREATE TABLE IF NOT EXISTS emoji_daily_stats (
+    course_id INT NOT NULL,
+    session_date DATE NOT NULL,
+    emoji VARCHAR(10) NOT NULL,
+    emoji_name VARCHAR(50),
+    count INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_id, session_date, emoji),
+    FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+    INDEX idx_date (session_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,18 @@
+-- 为热点查询添加联合/覆盖索引，替换被前缀覆盖的单列索引
+
+-- 表情记录：课程内按 (日期, 时间) 倒序分页；按日期范围跨课程导出
+ALTER TABLE emoji_records
+    ADD INDEX idx_course_date_time (course_id, session_date, session_time),
+    ADD INDEX idx_date_time (session_date, session_time),
+    DROP INDEX idx_course,
+    DROP INDEX idx_date;
+
+-- 用户表情记录：按用户倒序查看历史（覆盖索引，无需回表即可排序）
+ALTER TABLE user_emoji_records
+    ADD INDEX idx_user_record (user_id, emoji_record_id),
+    DROP INDEX idx_user;
+
+-- 表情日汇总：跨课程按日期范围统计（覆盖索引，按 GROUP BY 顺序读取）
+ALTER TABLE emoji_daily_stats
+    ADD INDEX idx_date_emoji (session_date, emoji, count),
+    DROP INDEX idx_date;
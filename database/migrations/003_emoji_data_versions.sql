@@ -0,0 +1,10 @@
+-- 课程数据版本号（每次写入表情记录时在同一事务中递增，用于 ETag / Last-Modified）
+CREATE TABLE IF NOT EXISTS emoji_data_versions (
+    course_id INT PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO emoji_data_versions (course_id, version)
+SELECT id, 1 FROM courses;
@@ -0,0 +1,9 @@
+-- 批量提交的幂等键（客户端为每条提交生成，重复同步时据此去重）
+CREATE TABLE IF NOT EXISTS emoji_submission_keys (
+    user_id INT NOT NULL,
+    client_key VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, client_key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,11 @@
+-- 全局数据版本号（只增不减；“全部课程”统计的数据版本和课程列表版本，用于 ETag / Last-Modified）
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO data_versions (name, version)
+SELECT 'emoji', COALESCE(SUM(version), 0) + 1 FROM emoji_data_versions;
+
+INSERT IGNORE INTO data_versions (name, version) VALUES ('courses', 1);
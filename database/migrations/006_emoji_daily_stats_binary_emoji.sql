@@ -0,0 +1,5 @@
+-- 日汇总表的 emoji 列改用二进制排序规则：utf8mb4_unicode_ci 下所有表情（U+1F6xx、U+1F9xx 等）
+-- 比较结果相同，主键 (course_id, session_date, emoji) 会把同一课程同一天的不同表情合并为一行。
+-- 执行后运行 python database/rebuild_rollups.py 重建已合并的汇总数据
+ALTER TABLE emoji_daily_stats
+    MODIFY emoji VARCHAR(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL;
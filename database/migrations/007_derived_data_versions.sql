@@ -0,0 +1,6 @@
+-- 数据版本改由最新表情记录的自增ID得到，提交表情时不再更新版本行（避免同一课程或全部提交争用同一行锁）。
+-- 按课程取最新记录使用 (course_id, id) 索引；data_versions 中的 emoji 计数器只在重建汇总时递增。
+ALTER TABLE emoji_records
+    ADD INDEX idx_course_id (course_id, id);
+
+DROP TABLE IF EXISTS emoji_data_versions;
@@ -0,0 +1,33 @@
+"""重建表情日汇总表（emoji_daily_stats）的脚本
+
+首次部署汇总表、或怀疑计数与原始记录不一致时运行：
+
+    python database/rebuild_rollups.py              # 重建全部课程
+    python database/rebuild_rollups.py --course 3   # 只重建指定课程
+
+重建在单个事务中完成，期间新的提交会等待该事务结束。
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, mysql
+from models.emoji_rollup import EmojiRollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建表情日汇总表')
+    parser.add_argument('--course', type=int, default=None, help='只重建指定课程ID')
+    args = parser.parse_args()
+
+    with app.app_context():
+        rows = EmojiRollup.rebuild(mysql, course_id=args.course)
+
+    scope = f'课程 {args.course}' if args.course else '全部课程'
+    print(f'重建完成（{scope}）：写入 {rows} 条汇总记录')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,11 @@
 """课程模型"""
+from config import Config
+from models.data_version import COURSE_LIST, DataVersion
+from utils.cache import TTLCache
+
+# 学生选课索引缓存：'<user_id>:ids' -> 已选课程ID集合，'<user_id>:courses' -> 已选课程列表
+enrollment_cache = TTLCache(maxsize=Config.ENROLLMENT_CACHE_SIZE, ttl=Config.ENROLLMENT_CACHE_TTL,
+                            namespace='enrollment')
 
 class Course:
     """课程类"""
@@ -10,11 +17,17 @@ class Course:
         sql = """INSERT INTO courses (course_name, course_code, teacher_id, description, semester) 
                  VALUES (%s, %s, %s, %s, %s)"""
         cursor.execute(sql, (course_name, course_code, teacher_id, description, semester))
-        mysql.connection.commit()
         course_id = cursor.lastrowid
+        DataVersion.bump(cursor, COURSE_LIST)
+        mysql.connection.commit()
         cursor.close()
         return course_id
     
+    @staticmethod
+    def get_list_version(mysql):
+        """课程列表版本：(版本号, 最后修改时间)，创建课程时递增，用于包含课程列表的页面的 ETag"""
+        return DataVersion.get(mysql, COURSE_LIST)
+    
     @staticmethod
     def get_by_id(mysql, course_id):
         """根据ID获取课程"""
@@ -43,9 +56,49 @@ class Course:
         cursor.close()
         return courses
     
+    @staticmethod
+    def count_courses(mysql, teacher_id=None, is_active=True):
+        """统计课程数"""
+        cursor = mysql.connection.cursor()
+        if teacher_id:
+            cursor.execute("SELECT COUNT(*) AS count FROM courses WHERE teacher_id = %s AND is_active = %s",
+                          (teacher_id, is_active))
+        else:
+            cursor.execute("SELECT COUNT(*) AS count FROM courses WHERE is_active = %s", (is_active,))
+        count = cursor.fetchone()['count']
+        cursor.close()
+        return count
+    
+    @staticmethod
+    def get_enrollment_counts(mysql, course_ids=None):
+        """统计各课程的选课人数，返回 {课程ID: 人数}（不指定 course_ids 时统计全部课程）"""
+        if course_ids is not None and not course_ids:
+            return {}
+        cursor = mysql.connection.cursor()
+        if course_ids is None:
+            cursor.execute("SELECT course_id, COUNT(*) AS count FROM user_courses GROUP BY course_id")
+        else:
+            course_ids = list(course_ids)
+            placeholders = ", ".join(["%s"] * len(course_ids))
+            cursor.execute(f"""SELECT course_id, COUNT(*) AS count FROM user_courses
+                               WHERE course_id IN ({placeholders}) GROUP BY course_id""", course_ids)
+        counts = {row['course_id']: row['count'] for row in cursor.fetchall()}
+        cursor.close()
+        return counts
+    
     @staticmethod
     def get_student_courses(mysql, user_id):
-        """获取学生已选课程"""
+        """获取学生已选课程（带缓存，选课时失效）"""
+        key = f'{user_id}:courses'
+        courses = enrollment_cache.get(key)
+        if courses is None:
+            courses = Course._query_student_courses(mysql, user_id)
+            enrollment_cache.set(key, courses)
+        return courses
+    
+    @staticmethod
+    def _query_student_courses(mysql, user_id):
+        """从数据库查询学生已选课程"""
         cursor = mysql.connection.cursor()
         sql = """SELECT c.*, u.full_name as teacher_name 
                  FROM courses c
@@ -66,19 +119,69 @@ class Course:
                           (user_id, course_id))
             mysql.connection.commit()
             cursor.close()
+            Course.invalidate_enrollments(user_id)
             return True
         except:
             mysql.connection.rollback()
             cursor.close()
             return False
     
+    @staticmethod
+    def invalidate_enrollments(user_id):
+        """使学生的选课索引失效"""
+        enrollment_cache.delete(f'{user_id}:ids')
+        enrollment_cache.delete(f'{user_id}:courses')
+    
+    @staticmethod
+    def get_enrolled_course_ids(mysql, user_id):
+        """获取学生已选课程ID集合（带缓存，选课时失效）"""
+        key = f'{user_id}:ids'
+        course_ids = enrollment_cache.get(key)
+        if course_ids is None:
+            cursor = mysql.connection.cursor()
+            cursor.execute("SELECT course_id FROM user_courses WHERE user_id = %s", (user_id,))
+            course_ids = frozenset(row['course_id'] for row in cursor.fetchall())
+            cursor.close()
+            enrollment_cache.set(key, course_ids)
+        return course_ids
+    
+    @staticmethod
+    def get_enrolled_among(mysql, user_id, course_ids):
+        """返回 course_ids 中学生已选的课程ID集合
+        
+        先用缓存的索引判定，索引中没有的课程用一次 IN 查询确认（同 is_student_enrolled）
+        """
+        enrolled_ids = Course.get_enrolled_course_ids(mysql, user_id)
+        enrolled = {course_id for course_id in course_ids if course_id in enrolled_ids}
+        unknown = [course_id for course_id in course_ids if course_id not in enrolled]
+        if not unknown:
+            return enrolled
+        
+        cursor = mysql.connection.cursor()
+        placeholders = ", ".join(["%s"] * len(unknown))
+        cursor.execute(f"SELECT course_id FROM user_courses WHERE user_id = %s AND course_id IN ({placeholders})",
+                      [user_id] + unknown)
+        found = {row['course_id'] for row in cursor.fetchall()}
+        cursor.close()
+        if found:
+            Course.invalidate_enrollments(user_id)
+        return enrolled | found
+    
     @staticmethod
     def is_student_enrolled(mysql, user_id, course_id):
-        """检查学生是否已选该课程"""
+        """检查学生是否已选该课程
+        
+        已选课程直接由缓存的索引判定；索引中没有时再查询数据库确认，
+        防止其它进程刚完成的选课因本地索引过期而被误判。
+        """
+        if course_id in Course.get_enrolled_course_ids(mysql, user_id):
+            return True
+        
         cursor = mysql.connection.cursor()
         cursor.execute("SELECT id FROM user_courses WHERE user_id = %s AND course_id = %s", 
                       (user_id, course_id))
         result = cursor.fetchone()
         cursor.close()
+        if result is not None:
+            Course.invalidate_enrollments(user_id)
         return result is not None
-
@@ -0,0 +1,33 @@
+"""全局数据版本号（只增不减的计数器，用于 HTTP 条件请求）"""
+from datetime import datetime, timezone
+
+# 计数器名称
+ROLLUP_REBUILDS = 'emoji'  # 汇总表重建（提交表情不递增，提交由 emoji_records 的自增ID体现）
+COURSE_LIST = 'courses'   # 课程列表变化
+
+
+class DataVersion:
+    """全局数据版本号
+
+    data_versions 表每个计数器一行，在低频写入（创建课程、重建汇总）的同一事务中递增，
+    只增不减，可以安全地放入 ETag。高频的表情提交路径不写这张表，避免所有提交争用同一行锁。
+    """
+
+    @staticmethod
+    def bump(cursor, name):
+        """递增计数器（由调用方负责提交事务）"""
+        cursor.execute("""INSERT INTO data_versions (name, version) VALUES (%s, 1)
+                          ON DUPLICATE KEY UPDATE version = version + 1""", (name,))
+
+    @staticmethod
+    def get(mysql, name):
+        """获取计数器：(版本号, 最后修改时间)，最后修改时间为带时区的 UTC 时间，无数据时为 (0, None)"""
+        cursor = mysql.connection.cursor()
+        cursor.execute("""SELECT version, UNIX_TIMESTAMP(updated_at) AS updated_at
+                          FROM data_versions WHERE name = %s""", (name,))
+        row = cursor.fetchone()
+        cursor.close()
+
+        if not row:
+            return 0, None
+        return row['version'], datetime.fromtimestamp(int(row['updated_at']), timezone.utc)
@@ -1,18 +1,47 @@
 """表情符号记录模型"""
+import pymysql
 from datetime import datetime, date
+from config import Config
+from models.emoji_rollup import EmojiRollup
+from utils.cache import TTLCache
+from utils.write_behind import QueueFullError
+
+# 统计结果缓存：'<course_id|all>:<start_date>:<end_date>' -> (数据版本, 统计结果)，共享后端由 app.py 设置
+stats_cache = TTLCache(maxsize=Config.STATS_CACHE_SIZE, ttl=Config.STATS_CACHE_TTL, namespace='stats')
+
+# 热力图可选的时段长度（分钟，均能整除一天）
+HEATMAP_SLOT_MINUTES = (10, 15, 20, 30, 60, 120)
+WEEKDAY_LABELS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
 
 class EmojiRecord:
     """表情符号记录类"""
     
+    # 后写队列（启用 EMOJI_WRITE_BEHIND 时由 app.py 设置），为 None 时同步写入
+    submission_queue = None
+    
+    # 实时推送（由 app.py 设置），记录提交到数据库后按课程发布计数增量
+    live_feed = None
+    
     @staticmethod
     def create_record(mysql, user_id, course_id, emoji, emoji_name, comment=None):
-        """创建表情记录（匿名化存储）"""
-        cursor = mysql.connection.cursor()
+        """创建表情记录（匿名化存储）
         
+        启用后写队列时只入队并返回 None，由后台线程批量写入；队列已满时同步写入。
+        """
         # 获取当前日期和时间
         session_date = date.today()
         session_time = datetime.now().time()
         
+        if EmojiRecord.submission_queue is not None:
+            try:
+                EmojiRecord.submission_queue.put(
+                    (user_id, course_id, emoji, emoji_name, session_date, session_time, comment))
+                return None
+            except QueueFullError:
+                pass
+        
+        cursor = mysql.connection.cursor()
+        
         # 在emoji_records表中插入匿名记录
         sql = """INSERT INTO emoji_records (course_id, emoji, emoji_name, session_date, session_time, comment) 
                  VALUES (%s, %s, %s, %s, %s, %s)"""
@@ -23,101 +52,258 @@ class EmojiRecord:
         sql = "INSERT INTO user_emoji_records (user_id, emoji_record_id) VALUES (%s, %s)"
         cursor.execute(sql, (user_id, emoji_record_id))
         
+        # 在同一事务中更新日汇总计数
+        EmojiRollup.increment(cursor, course_id, session_date, emoji, emoji_name)
+        
         mysql.connection.commit()
         cursor.close()
+        
+        EmojiRecord.invalidate_statistics([(course_id, session_date)])
+        EmojiRecord.publish_counts({(course_id, session_date, emoji): (emoji_name, 1)})
         return emoji_record_id
     
     @staticmethod
-    def get_user_records(mysql, user_id):
-        """获取用户自己的表情历史记录"""
+    def create_records(mysql, submissions, client_keys=None):
+        """批量创建表情记录（一个事务）
+        
+        submissions 中每项为 (user_id, course_id, emoji, emoji_name, session_date, session_time, comment)；
+        client_keys 为 (user_id, 幂等键) 列表，在同一事务中写入，已存在时抛出 IntegrityError 并整体回滚
+        """
+        cursor = mysql.connection.cursor()
+        try:
+            if client_keys:
+                placeholders = ", ".join(["(%s, %s)"] * len(client_keys))
+                params = [value for pair in client_keys for value in pair]
+                cursor.execute(f"INSERT INTO emoji_submission_keys (user_id, client_key) VALUES {placeholders}",
+                               params)
+            
+            # 逐行插入并取各行的 lastrowid：innodb_autoinc_lock_mode=2（MySQL 8 默认）下，
+            # 并发时一条多行 INSERT 分到的自增ID不保证连续，不能由第一行的ID推算，
+            # 否则用户与匿名记录的关联可能错位；整批仍在一个事务中提交
+            sql = """INSERT INTO emoji_records (course_id, emoji, emoji_name, session_date, session_time, comment) 
+                     VALUES (%s, %s, %s, %s, %s, %s)"""
+            record_ids = []
+            for _, course_id, emoji, emoji_name, session_date, session_time, comment in submissions:
+                cursor.execute(sql, (course_id, emoji, emoji_name, session_date, session_time, comment))
+                record_ids.append(cursor.lastrowid)
+            
+            placeholders = ", ".join(["(%s, %s)"] * len(submissions))
+            params = []
+            for submission, record_id in zip(submissions, record_ids):
+                params.extend([submission[0], record_id])
+            cursor.execute(f"INSERT INTO user_emoji_records (user_id, emoji_record_id) VALUES {placeholders}", params)
+            
+            # 汇总计数按 (课程, 日期, 表情) 合并后一次写入
+            counts = {}
+            for _, course_id, emoji, emoji_name, session_date, _, _ in submissions:
+                key = (course_id, session_date, emoji)
+                counts[key] = (emoji_name, counts.get(key, (None, 0))[1] + 1)
+            EmojiRollup.increment_many(cursor, counts)
+            
+            mysql.connection.commit()
+        except Exception:
+            mysql.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        
+        EmojiRecord.invalidate_statistics((course_id, session_date) for course_id, session_date, _ in counts)
+        EmojiRecord.publish_counts(counts)
+        return record_ids
+    
+    @staticmethod
+    def get_submitted_keys(mysql, user_id, client_keys):
+        """返回已提交过的幂等键集合"""
+        if not client_keys:
+            return set()
+        client_keys = list(client_keys)
+        placeholders = ", ".join(["%s"] * len(client_keys))
         cursor = mysql.connection.cursor()
-        sql = """SELECT er.*, c.course_name, c.course_code
-                 FROM emoji_records er
-                 INNER JOIN user_emoji_records uer ON er.id = uer.emoji_record_id
-                 INNER JOIN courses c ON er.course_id = c.id
-                 WHERE uer.user_id = %s
-                 ORDER BY er.created_at DESC"""
-        cursor.execute(sql, (user_id,))
-        records = cursor.fetchall()
+        cursor.execute(f"""SELECT client_key FROM emoji_submission_keys
+                           WHERE user_id = %s AND client_key IN ({placeholders})""", [user_id] + client_keys)
+        submitted = {row['client_key'] for row in cursor.fetchall()}
         cursor.close()
+        return submitted
+    
+    @staticmethod
+    def publish_counts(counts):
+        """发布计数增量，counts 为 {(course_id, session_date, emoji): (emoji_name, delta)}
         
-        # 处理时间格式
-        for record in records:
-            if record['session_time'] and hasattr(record['session_time'], 'seconds'):
-                hours = record['session_time'].seconds // 3600
-                minutes = (record['session_time'].seconds // 60) % 60
-                seconds = record['session_time'].seconds % 60
-                record['time_formatted'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            else:
-                record['time_formatted'] = ""
-                
-        return records
+        每条增量同时发布到课程频道 course:<id> 和全部课程频道 course:all
+        """
+        if EmojiRecord.live_feed is None:
+            return
+        for (course_id, session_date, emoji), (emoji_name, delta) in counts.items():
+            event = {
+                'course_id': int(course_id),
+                'session_date': str(session_date),
+                'emoji': emoji,
+                'emoji_name': emoji_name,
+                'delta': delta
+            }
+            EmojiRecord.live_feed.publish(f'course:{int(course_id)}', event)
+            EmojiRecord.live_feed.publish('course:all', event)
+    
+    # 记录列表查询的列：上课时间由数据库格式化为 HH:MM:SS 字符串，不再返回 timedelta
+    # （查询都带参数，% 需要转义）
+    RECORD_COLUMNS = """er.id, er.course_id, er.emoji, er.emoji_name, er.session_date,
+                         TIME_FORMAT(er.session_time, '%%H:%%i:%%s') AS time_formatted,
+                         er.comment, er.created_at"""
+    
+    # 键集分页的 WHERE 条件（DESC 排序下取严格更小的键）
+    SESSION_KEYSET = """(session_date < %s OR (session_date = %s AND
+                         (session_time < %s OR (session_time = %s AND id < %s))))"""
     
     @staticmethod
-    def get_course_records(mysql, course_id, start_date=None, end_date=None):
-        """获取课程的所有表情记录（匿名）"""
-        cursor = mysql.connection.cursor()
+    def get_user_records(mysql, user_id, limit=None, after=None):
+        """获取用户自己的表情历史记录
+        
+        按记录ID倒序（自增ID与 created_at 同序），可直接沿 user_emoji_records 的
+        (user_id, emoji_record_id) 索引读取；after 为上一页最后一行的 (id,)，用于键集分页
+        """
+        conditions = ["uer.user_id = %s"]
+        params = [user_id]
+        
+        if after:
+            conditions.append("uer.emoji_record_id < %s")
+            params.append(after[0])
+        
+        sql = f"""SELECT STRAIGHT_JOIN {EmojiRecord.RECORD_COLUMNS}, c.course_name, c.course_code
+                  FROM user_emoji_records uer
+                  INNER JOIN emoji_records er ON er.id = uer.emoji_record_id
+                  INNER JOIN courses c ON er.course_id = c.id
+                  WHERE {" AND ".join(conditions)}
+                  ORDER BY uer.emoji_record_id DESC"""
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return EmojiRecord._fetch_records(mysql, sql, params)
+    
+    @staticmethod
+    def get_course_records(mysql, course_id, start_date=None, end_date=None, limit=None, after=None):
+        """获取课程的所有表情记录（匿名）
+        
+        after 为上一页最后一行的 (session_date, time_formatted, id)，用于键集分页
+        """
+        conditions = ["course_id = %s"]
+        params = [course_id]
         
         if start_date and end_date:
-            sql = """SELECT emoji, emoji_name, session_date, session_time, comment, created_at
-                     FROM emoji_records
-                     WHERE course_id = %s AND session_date BETWEEN %s AND %s
-                     ORDER BY session_date DESC, session_time DESC"""
-            cursor.execute(sql, (course_id, start_date, end_date))
-        else:
-            sql = """SELECT emoji, emoji_name, session_date, session_time, comment, created_at
-                     FROM emoji_records
-                     WHERE course_id = %s
-                     ORDER BY session_date DESC, session_time DESC"""
-            cursor.execute(sql, (course_id,))
+            conditions.append("session_date BETWEEN %s AND %s")
+            params.extend([start_date, end_date])
         
-        records = cursor.fetchall()
+        if after:
+            conditions.append(EmojiRecord.SESSION_KEYSET)
+            params.extend([after[0], after[0], after[1], after[1], after[2]])
         
-        # 处理时间格式
-        for record in records:
-            if record['session_time'] and hasattr(record['session_time'], 'seconds'):
-                hours = record['session_time'].seconds // 3600
-                minutes = (record['session_time'].seconds // 60) % 60
-                seconds = record['session_time'].seconds % 60
-                record['time_formatted'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            else:
-                record['time_formatted'] = ""
+        sql = f"""SELECT {EmojiRecord.RECORD_COLUMNS}
+                  FROM emoji_records er
+                  WHERE {" AND ".join(conditions)}
+                  ORDER BY session_date DESC, session_time DESC, id DESC"""
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return EmojiRecord._fetch_records(mysql, sql, params)
+    
+    @staticmethod
+    def get_all_records(mysql, limit=1000, after=None):
+        """获取所有表情记录（管理员用）
         
-        cursor.close()
-        return records
+        按主键倒序（自增ID与 created_at 同序）；after 为上一页最后一行的 (id,)，用于键集分页
+        """
+        where_clause = "1=1"
+        params = []
+        
+        if after:
+            where_clause = "er.id < %s"
+            params.append(after[0])
+        
+        sql = f"""SELECT STRAIGHT_JOIN {EmojiRecord.RECORD_COLUMNS}, c.course_name, c.course_code
+                  FROM emoji_records er
+                  INNER JOIN courses c ON er.course_id = c.id
+                  WHERE {where_clause}
+                  ORDER BY er.id DESC
+                  LIMIT %s"""
+        params.append(limit)
+        return EmojiRecord._fetch_records(mysql, sql, params)
     
     @staticmethod
-    def get_all_records(mysql, limit=1000):
-        """获取所有表情记录（管理员用）"""
+    def _fetch_records(mysql, sql, params):
+        """执行记录列表查询（列见 RECORD_COLUMNS，行由驱动一次构造完成，不再逐行补充字段）"""
         cursor = mysql.connection.cursor()
-        sql = """SELECT er.*, c.course_name, c.course_code
-                 FROM emoji_records er
-                 INNER JOIN courses c ON er.course_id = c.id
-                 ORDER BY er.created_at DESC
-                 LIMIT %s"""
-        cursor.execute(sql, (limit,))
+        cursor.execute(sql, params)
         records = cursor.fetchall()
-        
-        # 处理时间格式
-        for record in records:
-            if record['session_time'] and hasattr(record['session_time'], 'seconds'):
-                hours = record['session_time'].seconds // 3600
-                minutes = (record['session_time'].seconds // 60) % 60
-                seconds = record['session_time'].seconds % 60
-                record['time_formatted'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            else:
-                record['time_formatted'] = ""
-        
         cursor.close()
         return records
     
     @staticmethod
-    def get_statistics(mysql, course_id=None, start_date=None, end_date=None):
-        """获取表情统计数据"""
-        cursor = mysql.connection.cursor()
+    def serialize(record):
+        """将记录转换为可 JSON 序列化的字典（不含用户身份信息）"""
+        data = {
+            'emoji': record['emoji'],
+            'emoji_name': record['emoji_name'],
+            'session_date': str(record['session_date']),
+            'session_time': record.get('time_formatted', ''),
+            'comment': record['comment'],
+        }
+        if 'course_name' in record:
+            data['course_name'] = record['course_name']
+            data['course_code'] = record['course_code']
+        else:
+            data['course_id'] = record['course_id']
+        return data
+    
+    @staticmethod
+    def get_statistics(mysql, course_id=None, start_date=None, end_date=None, version=None):
+        """获取表情统计数据（从日汇总表读取，带缓存）
+        
+        写入记录后按 (课程, 日期) 定向失效；传入 version（数据版本）时，
+        由其它版本计算的缓存结果视为未命中
+        """
+        if not (start_date and end_date):
+            start_date = end_date = None
+        key = f'{course_id or "all"}:{start_date or ""}:{end_date or ""}'
+        
+        cached = stats_cache.get(key)
+        if cached is not None and (version is None or cached[0] == version):
+            return cached[1]
+        
+        stats = EmojiRollup.get_statistics(mysql, course_id=course_id,
+                                           start_date=start_date, end_date=end_date)
+        stats_cache.set(key, (version, stats))
+        return stats
+    
+    @staticmethod
+    def invalidate_statistics(course_dates):
+        """使包含指定 (课程ID, 日期) 的统计缓存失效（含全部课程的统计）
+        
+        只能遍历本进程的缓存键；其它进程的缓存最多在 STATS_CACHE_TTL 秒内仍可能返回旧值
+        """
+        course_dates = {(str(course_id), str(session_date)) for course_id, session_date in course_dates}
+        for key in stats_cache.keys():
+            course, start, end = key.split(':')
+            for course_id, session_date in course_dates:
+                if course in ('all', course_id) and (not start or start <= session_date <= end):
+                    stats_cache.delete(key)
+                    break
+    
+    @staticmethod
+    def get_data_version(mysql, course_id=None):
+        """获取统计数据版本：(版本号, 最后修改时间)，用于 HTTP 条件请求"""
+        return EmojiRollup.get_version(mysql, course_id=course_id)
+    
+    @staticmethod
+    def get_heatmap(mysql, course_id=None, start_date=None, end_date=None, slot_minutes=30):
+        """按 (星期, 课堂时段) 统计各表情数量
+        
+        在数据库中一次 GROUP BY 完成汇总（经 course_id/session_date 索引定位范围），只返回非零格子；
+        结果整理为稠密数组 counts[表情][星期][时段]，星期 0 为周一，时段只覆盖有数据的最早到最晚时段
+        """
+        if slot_minutes not in HEATMAP_SLOT_MINUTES:
+            raise ValueError(f'时段长度只能为 {", ".join(map(str, HEATMAP_SLOT_MINUTES))} 分钟')
         
         conditions = []
-        params = []
+        params = [slot_minutes * 60]
         
         if course_id:
             conditions.append("course_id = %s")
@@ -129,42 +315,59 @@ class EmojiRecord:
         
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         
-        # 按表情统计
-        sql = f"""SELECT emoji, emoji_name, COUNT(*) as count
+        # 结果直接填入数组，不需要排序（MySQL 5.7 的 GROUP BY 默认会排序）；
+        # emoji 列为 utf8mb4_unicode_ci，不同表情比较结果相同，按二进制值分组
+        sql = f"""SELECT WEEKDAY(session_date) AS weekday,
+                         TIME_TO_SEC(session_time) DIV %s AS slot,
+                         emoji COLLATE utf8mb4_bin AS emoji_bin, COUNT(*) AS count
                   FROM emoji_records
                   WHERE {where_clause}
-                  GROUP BY emoji, emoji_name
-                  ORDER BY count DESC"""
+                  GROUP BY weekday, slot, emoji_bin
+                  ORDER BY NULL"""
+        cursor = mysql.connection.cursor()
         cursor.execute(sql, params)
-        emoji_stats = cursor.fetchall()
+        rows = cursor.fetchall()
+        cursor.close()
         
-        # 按日期统计
-        sql = f"""SELECT session_date, COUNT(*) as count
-                  FROM emoji_records
-                  WHERE {where_clause}
-                  GROUP BY session_date
-                  ORDER BY session_date DESC"""
-        cursor.execute(sql, params)
-        date_stats = cursor.fetchall()
+        slots_per_day = 24 * 60 // slot_minutes
+        rows = [row for row in rows if 0 <= row['slot'] < slots_per_day]
         
-        # 总数统计
-        sql = f"""SELECT COUNT(*) as total FROM emoji_records WHERE {where_clause}"""
-        cursor.execute(sql, params)
-        total = cursor.fetchone()['total']
+        # 按表情列表的顺序排列出现过的表情，列表之外的表情排在最后
+        present = {row['emoji_bin'] for row in rows}
+        emojis = [emoji for emoji in Config.EMOJI_LIST if emoji in present]
+        emojis.extend(sorted(present.difference(emojis)))
+        emoji_index = {emoji: i for i, emoji in enumerate(emojis)}
         
-        cursor.close()
+        first = min((row['slot'] for row in rows), default=0)
+        last = max((row['slot'] for row in rows), default=-1)
+        width = last - first + 1
+        
+        counts = [[[0] * width for _ in WEEKDAY_LABELS] for _ in emojis]
+        totals = [[0] * width for _ in WEEKDAY_LABELS]
+        for row in rows:
+            slot = row['slot'] - first
+            counts[emoji_index[row['emoji_bin']]][row['weekday']][slot] += row['count']
+            totals[row['weekday']][slot] += row['count']
+        
+        slot_labels = []
+        for slot in range(first, last + 1):
+            minutes = slot * slot_minutes
+            slot_labels.append(f'{minutes // 60:02d}:{minutes % 60:02d}')
         
         return {
-            'emoji_stats': emoji_stats,
-            'date_stats': date_stats,
-            'total': total
+            'slot_minutes': slot_minutes,
+            'weekdays': WEEKDAY_LABELS,
+            'slots': slot_labels,
+            'emojis': emojis,
+            'emoji_names': [Config.EMOJI_NAMES.get(emoji, emoji) for emoji in emojis],
+            'counts': counts,
+            'totals': totals,
+            'total': sum(map(sum, totals))
         }
     
     @staticmethod
-    def export_records(mysql, course_id=None, start_date=None, end_date=None):
-        """导出表情记录数据（用于CSV导出）"""
-        cursor = mysql.connection.cursor()
-        
+    def _export_query(course_id=None, start_date=None, end_date=None):
+        """构造导出查询语句及参数"""
         conditions = []
         params = []
         
@@ -178,15 +381,36 @@ class EmojiRecord:
         
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         
-        sql = f"""SELECT c.course_name, c.course_code, er.emoji, er.emoji_name, 
+        # STRAIGHT_JOIN 固定以 emoji_records 为驱动表，使排序可直接使用 (session_date, session_time) 索引
+        sql = f"""SELECT STRAIGHT_JOIN c.course_name, c.course_code, er.emoji, er.emoji_name, 
                         er.session_date, er.session_time, er.comment, er.created_at
                   FROM emoji_records er
                   INNER JOIN courses c ON er.course_id = c.id
                   WHERE {where_clause}
                   ORDER BY er.session_date DESC, er.session_time DESC"""
-        
+        return sql, params
+    
+    @staticmethod
+    def export_records(mysql, course_id=None, start_date=None, end_date=None):
+        """导出表情记录数据（用于CSV导出）"""
+        cursor = mysql.connection.cursor()
+        sql, params = EmojiRecord._export_query(course_id, start_date, end_date)
         cursor.execute(sql, params)
         records = cursor.fetchall()
         cursor.close()
         return records
-
+    
+    @staticmethod
+    def iter_export_records(mysql, course_id=None, start_date=None, end_date=None, chunk_size=1000):
+        """流式导出表情记录：使用服务端（无缓冲）游标，每次产出一块记录"""
+        cursor = mysql.connection.cursor(pymysql.cursors.SSDictCursor)
+        try:
+            sql, params = EmojiRecord._export_query(course_id, start_date, end_date)
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
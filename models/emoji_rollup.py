@@ -0,0 +1,160 @@
+"""表情日汇总模型（按 课程 × 日期 × 表情 预聚合的计数）"""
+from datetime import datetime, timezone
+
+from models.data_version import ROLLUP_REBUILDS, DataVersion
+
+
+class EmojiRollup:
+    """表情日汇总类
+
+    emoji_daily_stats 表在 EmojiRecord.create_record 的同一事务内增量维护，
+    统计查询的代价只与时间窗口内的天数有关，而与原始记录数无关。
+    数据版本由最新一条表情记录的自增ID和汇总重建次数得到，提交路径上不写版本表，
+    供 HTTP 条件请求判断数据是否变化。
+    """
+
+    @staticmethod
+    def increment(cursor, course_id, session_date, emoji, emoji_name, delta=1):
+        """累加一条计数（由调用方负责提交事务）"""
+        sql = """INSERT INTO emoji_daily_stats (course_id, session_date, emoji, emoji_name, count)
+                 VALUES (%s, %s, %s, %s, %s)
+                 ON DUPLICATE KEY UPDATE count = count + VALUES(count), emoji_name = VALUES(emoji_name)"""
+        cursor.execute(sql, (course_id, session_date, emoji, emoji_name, delta))
+
+    @staticmethod
+    def increment_many(cursor, counts):
+        """批量累加计数，counts 为 {(course_id, session_date, emoji): (emoji_name, delta)}"""
+        if not counts:
+            return
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(counts))
+        params = []
+        for (course_id, session_date, emoji), (emoji_name, delta) in counts.items():
+            params.extend([course_id, session_date, emoji, emoji_name, delta])
+        sql = f"""INSERT INTO emoji_daily_stats (course_id, session_date, emoji, emoji_name, count)
+                  VALUES {placeholders}
+                  ON DUPLICATE KEY UPDATE count = count + VALUES(count), emoji_name = VALUES(emoji_name)"""
+        cursor.execute(sql, params)
+
+    @staticmethod
+    def get_version(mysql, course_id=None):
+        """获取数据版本：(版本号, 最后修改时间)
+
+        版本号为 '<最新表情记录ID>-<汇总重建次数>'：汇总表与表情记录在同一事务中写入，
+        有新记录即有新的自增ID，两者都只增不减，读取时不需要在提交路径上维护版本行。
+        最新记录按主键（指定课程时按 idx_course_id）倒序取一行。
+        最后修改时间为带时区的 UTC 时间，无数据时为 None。
+        """
+        cursor = mysql.connection.cursor()
+        if course_id:
+            cursor.execute("""SELECT id, UNIX_TIMESTAMP(created_at) AS created_at FROM emoji_records
+                              WHERE course_id = %s ORDER BY id DESC LIMIT 1""", (course_id,))
+        else:
+            cursor.execute("""SELECT id, UNIX_TIMESTAMP(created_at) AS created_at FROM emoji_records
+                              ORDER BY id DESC LIMIT 1""")
+        row = cursor.fetchone()
+        cursor.close()
+
+        rebuilds, rebuilt_at = DataVersion.get(mysql, ROLLUP_REBUILDS)
+        last_id, updated_at = 0, rebuilt_at
+        if row:
+            last_id = row['id']
+            created_at = datetime.fromtimestamp(int(row['created_at']), timezone.utc)
+            if updated_at is None or created_at > updated_at:
+                updated_at = created_at
+        if not last_id and not rebuilds:
+            return 0, None
+        return f'{last_id}-{rebuilds}', updated_at
+
+    @staticmethod
+    def rebuild(mysql, course_id=None):
+        """根据 emoji_records 重建汇总数据（用于回填历史数据或修复计数）"""
+        cursor = mysql.connection.cursor()
+        try:
+            if course_id:
+                cursor.execute("DELETE FROM emoji_daily_stats WHERE course_id = %s", (course_id,))
+                where_clause = "WHERE course_id = %s"
+                params = (course_id,)
+            else:
+                cursor.execute("DELETE FROM emoji_daily_stats")
+                where_clause = ""
+                params = ()
+
+            # emoji_records.emoji 的排序规则不区分不同表情，按二进制值分组
+            sql = f"""INSERT INTO emoji_daily_stats (course_id, session_date, emoji, emoji_name, count)
+                      SELECT course_id, session_date, emoji COLLATE utf8mb4_bin, MAX(emoji_name), COUNT(*)
+                      FROM emoji_records
+                      {where_clause}
+                      GROUP BY course_id, session_date, emoji COLLATE utf8mb4_bin"""
+            cursor.execute(sql, params)
+            rows = cursor.rowcount
+
+            # 汇总已重建，递增重建次数使客户端缓存的响应失效（删除表情记录后也应重建）
+            DataVersion.bump(cursor, ROLLUP_REBUILDS)
+            mysql.connection.commit()
+            return rows
+        except Exception:
+            mysql.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get_statistics(mysql, course_id=None, start_date=None, end_date=None):
+        """从汇总表获取表情统计数据（返回结构与 EmojiRecord.get_statistics 相同）
+
+        一次 GROUP BY session_date, emoji WITH ROLLUP 同时得到 (日期, 表情) 明细、
+        每日小计和总计，按表情的合计由明细行在内存中累加。
+        """
+        cursor = mysql.connection.cursor()
+
+        conditions = []
+        params = []
+
+        if course_id:
+            conditions.append("course_id = %s")
+            params.append(course_id)
+
+        if start_date and end_date:
+            conditions.append("session_date BETWEEN %s AND %s")
+            params.extend([start_date, end_date])
+
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+
+        # MySQL 5.7 不支持 WITH ROLLUP 与 ORDER BY 同时使用，排序在内存中完成；
+        # emoji 列为 utf8mb4_bin（迁移 006），分组按二进制值区分不同表情，同时仍可按 idx_date_emoji 索引分组
+        sql = f"""SELECT session_date, emoji, MAX(emoji_name) as emoji_name,
+                         CAST(SUM(count) AS UNSIGNED) as count
+                  FROM emoji_daily_stats
+                  WHERE {where_clause}
+                  GROUP BY session_date, emoji WITH ROLLUP"""
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+
+        # session_date、emoji 均为 NOT NULL，值为 NULL 的行即 ROLLUP 生成的小计/总计行
+        total = 0
+        date_stats = []
+        daily_emoji_stats = []
+        emoji_totals = {}
+        for row in rows:
+            if row['session_date'] is None:
+                total = row['count']
+            elif row['emoji'] is None:
+                date_stats.append({'session_date': row['session_date'], 'count': row['count']})
+            else:
+                daily_emoji_stats.append(row)
+                item = emoji_totals.setdefault(row['emoji'], {'emoji': row['emoji'],
+                                                              'emoji_name': row['emoji_name'],
+                                                              'count': 0})
+                item['count'] += row['count']
+
+        emoji_stats = sorted(emoji_totals.values(), key=lambda item: item['count'], reverse=True)
+        date_stats.sort(key=lambda item: item['session_date'], reverse=True)
+        daily_emoji_stats.sort(key=lambda item: item['session_date'], reverse=True)
+
+        return {
+            'emoji_stats': emoji_stats,
+            'date_stats': date_stats,
+            'daily_emoji_stats': daily_emoji_stats,
+            'total': total
+        }
@@ -0,0 +1,148 @@
+"""名单批量导入（用户与选课）"""
+from itertools import islice
+from models.user import user_cache, password_hasher
+from models.course import Course
+from models.summary import SystemSummary
+from utils.roster import split_course_codes
+
+IMPORT_ROLES = ('student', 'teacher')
+
+# 已存在用户的占位哈希（ON DUPLICATE KEY 时不会写入）
+_EXISTING_USER_HASH = '!'
+
+
+class RosterImport:
+    """名单批量导入
+
+    逐块处理名单行：每块查询一次已存在的用户名，只为新用户并行计算密码哈希，
+    用多行 INSERT ... ON DUPLICATE KEY 写入用户和选课记录，并在一个事务中提交。
+    已存在的用户只补充姓名和邮箱，不修改密码和角色。同一用户名可出现在多行（如按课程分别列出）。
+    """
+
+    @staticmethod
+    def run(mysql, rows, chunk_size=500):
+        """导入 (行号, 字段字典) 序列，返回导入结果（含逐行错误）"""
+        result = {'total': 0, 'created': 0, 'updated': 0, 'enrolled': 0, 'errors': []}
+        course_ids = {course['course_code'].lower(): course['id']
+                      for course in Course.get_all_courses(mysql, is_active=True)}
+
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            result['total'] += len(chunk)
+
+            valid = []
+            for line, row in chunk:
+                error = RosterImport._validate(row, course_ids)
+                if error:
+                    result['errors'].append({'line': line, 'username': row.get('username', ''), 'error': error})
+                else:
+                    valid.append((line, row))
+            if valid:
+                RosterImport._import_chunk(mysql, valid, result)
+        return result
+
+    @staticmethod
+    def _validate(row, course_ids):
+        """校验单行并补全 role、course_ids 字段，返回错误信息或 None"""
+        username = row.get('username')
+        if not username:
+            return '缺少用户名'
+        if len(username) > 50:
+            return '用户名超过50个字符'
+        if row.get('email') and '@' not in row['email']:
+            return '邮箱格式不正确'
+
+        row['role'] = (row.get('role') or 'student').lower()
+        if row['role'] not in IMPORT_ROLES:
+            return f'不支持的角色：{row["role"]}'
+
+        codes = split_course_codes(row.get('course_codes'))
+        unknown = [code for code in codes if code.lower() not in course_ids]
+        if unknown:
+            return f'课程代码不存在：{", ".join(unknown)}'
+        if codes and row['role'] != 'student':
+            return '只有学生可以选课'
+        row['course_ids'] = [course_ids[code.lower()] for code in codes]
+        return None
+
+    @staticmethod
+    def _import_chunk(mysql, chunk, result):
+        """在一个事务中导入一块已校验的行"""
+        cursor = mysql.connection.cursor()
+        accepted = chunk
+        try:
+            usernames = list({row['username'].lower(): row['username'] for _, row in chunk}.values())
+            existing = RosterImport._fetch_users(cursor, usernames)
+
+            # 每个用户名取首次出现的行作为用户信息
+            first_rows = {}
+            accepted = []
+            for line, row in chunk:
+                key = row['username'].lower()
+                if key not in existing and key not in first_rows and not row.get('password'):
+                    result['errors'].append({'line': line, 'username': row['username'], 'error': '新用户缺少密码'})
+                    continue
+                first_rows.setdefault(key, row)
+                accepted.append((line, row))
+            if not first_rows:
+                return
+
+            new_keys = [key for key in first_rows if key not in existing]
+            hashes = dict(zip(new_keys, password_hasher.hash_many([first_rows[key]['password']
+                                                                  for key in new_keys])))
+
+            params = []
+            for key, row in first_rows.items():
+                params.extend([row['username'], hashes.get(key, _EXISTING_USER_HASH), row['role'],
+                               row.get('full_name'), row.get('email')])
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(first_rows))
+            cursor.execute(f"""INSERT INTO users (username, password_hash, role, full_name, email)
+                               VALUES {placeholders}
+                               ON DUPLICATE KEY UPDATE full_name = COALESCE(VALUES(full_name), full_name),
+                                                       email = COALESCE(VALUES(email), email)""", params)
+            users = RosterImport._fetch_users(cursor, [row['username'] for row in first_rows.values()])
+
+            enrollments = set()
+            for line, row in accepted:
+                user = users[row['username'].lower()]
+                if row['course_ids'] and user['role'] != 'student':
+                    result['errors'].append({'line': line, 'username': row['username'],
+                                             'error': '已存在的非学生账号不能选课'})
+                    continue
+                enrollments.update((user['id'], course_id) for course_id in row['course_ids'])
+
+            enrolled = 0
+            if enrollments:
+                placeholders = ", ".join(["(%s, %s)"] * len(enrollments))
+                params = [value for pair in sorted(enrollments) for value in pair]
+                cursor.execute(f"""INSERT INTO user_courses (user_id, course_id) VALUES {placeholders}
+                                   ON DUPLICATE KEY UPDATE user_id = user_id""", params)
+                enrolled = cursor.rowcount
+
+            mysql.connection.commit()
+        except Exception as e:
+            mysql.connection.rollback()
+            result['errors'].extend({'line': line, 'username': row['username'], 'error': f'写入失败：{e}'}
+                                    for line, row in accepted)
+            return
+        finally:
+            cursor.close()
+
+        result['created'] += len(new_keys)
+        result['updated'] += len(first_rows) - len(new_keys)
+        result['enrolled'] += enrolled
+        for key in existing:
+            user_cache.delete(existing[key]['id'])
+        for user_id in {user_id for user_id, _ in enrollments}:
+            Course.invalidate_enrollments(user_id)
+        SystemSummary.invalidate()
+
+    @staticmethod
+    def _fetch_users(cursor, usernames):
+        """按用户名查询用户，返回 {小写用户名: 用户行}"""
+        placeholders = ", ".join(["%s"] * len(usernames))
+        cursor.execute(f"SELECT id, username, role FROM users WHERE username IN ({placeholders})", usernames)
+        return {user['username'].lower(): user for user in cursor.fetchall()}
@@ -0,0 +1,38 @@
+"""系统概况（管理主页计数器）"""
+from config import Config
+from models.course import Course
+from models.user import User
+from utils.cache import TTLCache
+
+# 系统概况缓存，共享后端由 app.py 根据配置设置
+summary_cache = TTLCache(maxsize=16, ttl=Config.SUMMARY_CACHE_TTL, namespace='summary')
+
+
+class SystemSummary:
+    """系统概况
+
+    用户数（按角色）、课程数和各课程选课人数都由 COUNT 查询得到，耗时与用户规模无关；
+    结果缓存 SUMMARY_CACHE_TTL 秒，注册、选课和名单导入后立即失效。
+    """
+
+    @staticmethod
+    def get(mysql):
+        """获取系统概况"""
+        summary = summary_cache.get('system')
+        if summary is None:
+            role_counts = User.count_by_role(mysql)
+            enrollment_counts = Course.get_enrollment_counts(mysql)
+            summary = {
+                'users_count': sum(role_counts.values()),
+                'role_counts': role_counts,
+                'courses_count': Course.count_courses(mysql),
+                'enrollments_count': sum(enrollment_counts.values()),
+                'enrollment_counts': enrollment_counts,
+            }
+            summary_cache.set('system', summary)
+        return summary
+
+    @staticmethod
+    def invalidate():
+        """用户、课程或选课变化后调用"""
+        summary_cache.delete('system')
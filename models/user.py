@@ -1,6 +1,22 @@
 """用户模型"""
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from config import Config
+from utils.cache import TTLCache
+from utils.passwords import PasswordHasher, LoginThrottle
+
+# 用户对象缓存（按用户ID），共享后端由 app.py 根据配置设置
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL, namespace='user')
+
+# 密码哈希服务（进程池计算）
+password_hasher = PasswordHasher(method=Config.PASSWORD_HASH_METHOD,
+                                 workers=Config.PASSWORD_HASH_WORKERS,
+                                 max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+                                 timeout=Config.PASSWORD_HASH_TIMEOUT)
+
+# 登录失败限流（按用户名），共享后端由 app.py 根据配置设置
+login_throttle = LoginThrottle(max_failures=Config.LOGIN_MAX_FAILURES, window=Config.LOGIN_LOCKOUT_SECONDS)
+
+USER_ROLES = ('student', 'teacher', 'admin')
 
 class User(UserMixin):
     """用户类"""
@@ -13,9 +29,22 @@ class User(UserMixin):
         self.full_name = full_name
         self.email = email
     
-    def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+    def check_password(self, password, mysql=None):
+        """验证密码
+        
+        缓存中的用户对象（get_cached）不含密码哈希，此时需传入 mysql 从数据库读取最新的哈希，
+        避免其它进程修改密码后仍按缓存中的旧哈希校验。
+        """
+        password_hash = self.password_hash
+        if password_hash is None and mysql is not None:
+            password_hash = User.get_password_hash(mysql, self.id)
+        if not password_hash:
+            return False
+        return password_hasher.verify(password_hash, password)
+    
+    def needs_rehash(self):
+        """密码哈希参数是否已过时（登录成功后用明文密码重新哈希）"""
+        return self.password_hash is not None and password_hasher.needs_rehash(self.password_hash)
     
     def is_admin(self):
         """是否为管理员"""
@@ -32,7 +61,7 @@ class User(UserMixin):
     @staticmethod
     def hash_password(password):
         """密码加密"""
-        return generate_password_hash(password)
+        return password_hasher.hash(password)
     
     @staticmethod
     def create_user(mysql, username, password, role, full_name=None, email=None):
@@ -47,6 +76,7 @@ class User(UserMixin):
         user_id = cursor.lastrowid
         cursor.close()
         
+        user_cache.delete(user_id)
         return user_id
     
     @staticmethod
@@ -68,6 +98,29 @@ class User(UserMixin):
             )
         return None
     
+    @staticmethod
+    def get_cached(mysql, user_id):
+        """根据ID获取用户（优先读缓存，供 Flask-Login 每个请求加载用户）
+        
+        缓存的用户对象不含密码哈希（password_hash 为 None），校验密码时从数据库读取。
+        """
+        user = user_cache.get(user_id)
+        if user is None:
+            user = User.get_by_id(mysql, user_id)
+            if user is not None:
+                user.password_hash = None
+                user_cache.set(user_id, user)
+        return user
+    
+    @staticmethod
+    def get_password_hash(mysql, user_id):
+        """读取用户当前的密码哈希（用户不存在时返回 None）"""
+        cursor = mysql.connection.cursor()
+        cursor.execute("SELECT password_hash FROM users WHERE id = %s", (user_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row['password_hash'] if row else None
+    
     @staticmethod
     def get_by_username(mysql, username):
         """根据用户名获取用户"""
@@ -96,6 +149,7 @@ class User(UserMixin):
                       (password_hash, user_id))
         mysql.connection.commit()
         cursor.close()
+        user_cache.delete(user_id)
         return True
     
     @staticmethod
@@ -109,4 +163,13 @@ class User(UserMixin):
         users = cursor.fetchall()
         cursor.close()
         return users
-
+    
+    @staticmethod
+    def count_by_role(mysql):
+        """按角色统计用户数，返回 {角色: 人数}（没有用户的角色为 0）"""
+        cursor = mysql.connection.cursor()
+        cursor.execute("SELECT role, COUNT(*) AS count FROM users GROUP BY role")
+        counts = dict.fromkeys(USER_ROLES, 0)
+        counts.update((row['role'], row['count']) for row in cursor.fetchall())
+        cursor.close()
+        return counts
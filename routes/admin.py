@@ -1,13 +1,30 @@
 """管理员/教师相关路由"""
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response,
+                   abort, current_app, send_file, session)
 from flask_login import login_required, current_user
 from functools import wraps
 from models.user import User
 from models.course import Course
-from models.emoji_record import EmojiRecord
-import pandas as pd
-from io import BytesIO
+from models.emoji_record import EmojiRecord, HEATMAP_SLOT_MINUTES
+from models.roster import RosterImport
+from models.summary import SystemSummary
+from utils.export_jobs import ExportJobRunner
+from utils.exporters import EXPORT_FORMATS, parquet_available, write_export
+from utils.http_cache import ConditionalCache, make_etag, window_last_modified
+from utils.pagination import decode_cursor, paginate
+from utils.roster import iter_roster
+from utils.metrics import observe_export
+from config import Config
 from datetime import datetime, timedelta
+import json
+import time
+
+# 统计页面与图表数据的短期响应缓存（按 ETag 存储）
+response_cache = ConditionalCache(maxsize=Config.RESPONSE_CACHE_SIZE, ttl=Config.RESPONSE_CACHE_TTL)
+
+# 后台导出任务（文件写入暂存目录）
+export_jobs = ExportJobRunner(Config.EXPORT_SPOOL_DIR, workers=Config.EXPORT_WORKERS,
+                              max_bytes=Config.EXPORT_SPOOL_MAX_BYTES, max_age=Config.EXPORT_JOB_TTL)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -40,24 +57,106 @@ def admin_required(f):
 def init_admin_routes(mysql):
     """初始化管理员路由"""
     
+    def load_emoji_data_page(course_id, cursor_token):
+        """按键集分页读取一页表情记录，返回 (记录, 下一页游标)"""
+        page_size = Config.RECORDS_PER_PAGE
+        if course_id:
+            key_fields = ('session_date', 'time_formatted', 'id')
+            records = EmojiRecord.get_course_records(mysql, course_id, limit=page_size + 1,
+                                                     after=decode_cursor(cursor_token, 3))
+        else:
+            key_fields = ('id',)
+            records = EmojiRecord.get_all_records(mysql, limit=page_size + 1,
+                                                  after=decode_cursor(cursor_token, 1))
+        return paginate(records, page_size, key_fields)
+    
+    def count_rows(chunks, progress):
+        """逐块转发记录，并报告已读取的行数"""
+        rows = 0
+        for chunk in chunks:
+            yield chunk
+            rows += len(chunk)
+            progress(rows)
+    
+    def load_export_job(job_id):
+        """读取导出任务（只有提交者和管理员可以访问）"""
+        job = export_jobs.get(job_id)
+        if job is None or not (current_user.is_admin() or current_user.id in job.owners):
+            abort(404)
+        return job
+    
+    def export_job_status(job):
+        """导出任务状态（JSON 可序列化）"""
+        status = {
+            'job_id': job.id,
+            'status': job.status,
+            'rows': job.rows,
+            'total': job.total,
+            'progress': min(100.0, round(job.rows * 100 / job.total, 1)) if job.total else 0.0,
+            'filename': job.filename,
+            'size': job.size,
+            'error': job.error,
+            'status_url': url_for('admin.api_export_job', job_id=job.id),
+        }
+        if job.status == 'done':
+            status['progress'] = 100.0
+            status['download_url'] = url_for('admin.download_export', job_id=job.id)
+        return status
+    
+    def build_chart_data(course_id, start_date, end_date, version):
+        """生成图表数据（JSON）"""
+        # 获取统计数据
+        stats = EmojiRecord.get_statistics(mysql, course_id=course_id,
+                                          start_date=start_date, end_date=end_date,
+                                          version=version)
+        
+        # 格式化数据
+        emoji_labels = [item['emoji_name'] for item in stats['emoji_stats']]
+        emoji_values = [item['count'] for item in stats['emoji_stats']]
+        
+        date_labels = [str(item['session_date']) for item in stats['date_stats']]
+        date_values = [item['count'] for item in stats['date_stats']]
+        
+        # 每日各表情数量（用于堆叠图），与 date_chart 的日期顺序一致
+        date_index = {label: i for i, label in enumerate(date_labels)}
+        daily_series = {}
+        for item in stats['daily_emoji_stats']:
+            values = daily_series.setdefault(item['emoji_name'], [0] * len(date_labels))
+            values[date_index[str(item['session_date'])]] = item['count']
+        
+        return jsonify({
+            'emoji_chart': {
+                'labels': emoji_labels,
+                'values': emoji_values
+            },
+            'date_chart': {
+                'labels': date_labels,
+                'values': date_values
+            },
+            'daily_emoji_chart': {
+                'labels': date_labels,
+                'datasets': [{'label': name, 'values': values} for name, values in daily_series.items()]
+            },
+            'total': stats['total']
+        }).get_data()
+    
     @admin_bp.route('/dashboard')
     @login_required
     @admin_or_teacher_required
     def dashboard():
         """管理员主页"""
-        # 获取统计数据
-        users_count = len(User.get_all_users(mysql))
-        courses = Course.get_all_courses(mysql)
-        courses_count = len(courses)
+        # 获取统计数据（COUNT 查询，结果短期缓存）
+        summary = SystemSummary.get(mysql)
         
         # 获取最近7天的数据
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=7)
-        stats = EmojiRecord.get_statistics(mysql, start_date=start_date, end_date=end_date)
+        # 按数据版本校验缓存，其它进程写入的数据不会因本进程的旧缓存而看不到
+        stats = EmojiRecord.get_statistics(mysql, start_date=start_date, end_date=end_date,
+                                           version=EmojiRecord.get_data_version(mysql)[0])
         
         return render_template('admin/dashboard.html',
-                             users_count=users_count,
-                             courses_count=courses_count,
+                             summary=summary,
                              emoji_stats=stats)
     
     @admin_bp.route('/users')
@@ -69,6 +168,33 @@ def init_admin_routes(mysql):
         users_list = User.get_all_users(mysql, role=role_filter)
         return render_template('admin/users.html', users=users_list, role_filter=role_filter)
     
+    @admin_bp.route('/import_roster', methods=['GET', 'POST'])
+    @login_required
+    @admin_required
+    def import_roster():
+        """批量导入用户与选课名单（CSV/XLSX）"""
+        result = None
+        if request.method == 'POST':
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                flash('请选择名单文件', 'error')
+                return redirect(url_for('admin.import_roster'))
+            
+            try:
+                rows = iter_roster(upload.stream, upload.filename)
+                result = RosterImport.run(mysql, rows, chunk_size=Config.IMPORT_CHUNK_SIZE)
+            except ValueError as e:
+                # 已提交的块不会回滚，重新导入同一名单是安全的
+                flash(f'名单读取失败：{e}', 'error')
+                return redirect(url_for('admin.import_roster'))
+            
+            flash(f"导入完成：共 {result['total']} 行，新建 {result['created']} 个用户，"
+                  f"更新 {result['updated']} 个用户，新增 {result['enrolled']} 条选课，"
+                  f"{len(result['errors'])} 行出错",
+                  'warning' if result['errors'] else 'success')
+        
+        return render_template('admin/import_roster.html', result=result)
+    
     @admin_bp.route('/courses')
     @login_required
     @admin_or_teacher_required
@@ -78,7 +204,8 @@ def init_admin_routes(mysql):
             courses_list = Course.get_all_courses(mysql, teacher_id=current_user.id)
         else:
             courses_list = Course.get_all_courses(mysql)
-        return render_template('admin/courses.html', courses=courses_list)
+        enrollment_counts = Course.get_enrollment_counts(mysql, [course['id'] for course in courses_list])
+        return render_template('admin/courses.html', courses=courses_list, enrollment_counts=enrollment_counts)
     
     @admin_bp.route('/emoji_data')
     @login_required
@@ -93,87 +220,185 @@ def init_admin_routes(mysql):
         else:
             courses = Course.get_all_courses(mysql)
         
-        # 获取表情记录
-        if course_id:
-            records = EmojiRecord.get_course_records(mysql, course_id)
-        else:
-            records = EmojiRecord.get_all_records(mysql, limit=500)
+        # 获取表情记录（分页）
+        cursor_token = request.args.get('cursor')
+        records, next_cursor = load_emoji_data_page(course_id, cursor_token)
         
         return render_template('admin/emoji_data.html', 
                              records=records, 
                              courses=courses,
-                             selected_course_id=course_id)
+                             selected_course_id=course_id,
+                             is_first_page=not cursor_token,
+                             next_cursor=next_cursor,
+                             parquet_enabled=parquet_available())
+    
+    @admin_bp.route('/api/emoji_data')
+    @login_required
+    @admin_or_teacher_required
+    def api_emoji_data():
+        """表情数据分页API"""
+        course_id = request.args.get('course_id', None, type=int)
+        records, next_cursor = load_emoji_data_page(course_id, request.args.get('cursor'))
+        
+        return jsonify({
+            'records': [EmojiRecord.serialize(record) for record in records],
+            'next_cursor': next_cursor
+        })
     
     @admin_bp.route('/statistics')
     @login_required
     @admin_or_teacher_required
     def statistics():
-        """统计数据"""
+        """统计数据（数据未变化时返回 304 或缓存的页面）"""
         course_id = request.args.get('course_id', None, type=int)
         days = request.args.get('days', 30, type=int)
         
-        # 获取课程列表
-        if current_user.is_teacher():
-            courses = Course.get_all_courses(mysql, teacher_id=current_user.id)
-        else:
-            courses = Course.get_all_courses(mysql)
-        
         # 计算日期范围
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        # 获取统计数据
-        stats = EmojiRecord.get_statistics(mysql, course_id=course_id, 
-                                          start_date=start_date, end_date=end_date)
+        version, updated_at = EmojiRecord.get_data_version(mysql, course_id)
         
-        return render_template('admin/statistics.html',
-                             stats=stats,
-                             courses=courses,
-                             selected_course_id=course_id,
-                             days=days)
+        def build():
+            # 获取课程列表
+            if current_user.is_teacher():
+                courses = Course.get_all_courses(mysql, teacher_id=current_user.id)
+            else:
+                courses = Course.get_all_courses(mysql)
+            
+            # 获取统计数据
+            stats = EmojiRecord.get_statistics(mysql, course_id=course_id, 
+                                              start_date=start_date, end_date=end_date,
+                                              version=version)
+            
+            return render_template('admin/statistics.html',
+                                 stats=stats,
+                                 courses=courses,
+                                 selected_course_id=course_id,
+                                 days=days)
+        
+        # 有待显示的提示消息时页面内容不同，直接渲染
+        if session.get('_flashes'):
+            return build()
+        
+        # 页面包含用户名和该用户可见的课程列表，按用户和课程列表版本区分
+        courses_version, courses_updated_at = Course.get_list_version(mysql)
+        if courses_updated_at is not None and (updated_at is None or courses_updated_at > updated_at):
+            updated_at = courses_updated_at
+        etag = make_etag('statistics', version, courses_version, course_id, days, end_date,
+                         current_user.role, current_user.id)
+        return response_cache.respond(etag, window_last_modified(updated_at, end_date), build)
     
     @admin_bp.route('/export')
     @login_required
     @admin_or_teacher_required
     def export():
-        """导出数据为CSV"""
+        """导出数据（XLSX/CSV/Parquet）：提交后台导出任务，返回任务进度页面或任务ID"""
         course_id = request.args.get('course_id', None, type=int)
         days = request.args.get('days', 30, type=int)
+        fmt = request.args.get('format', 'xlsx')
+        if fmt not in EXPORT_FORMATS:
+            fmt = 'xlsx'
+        if fmt == 'parquet' and not parquet_available():
+            flash('服务器未安装 pyarrow，无法导出 Parquet 格式', 'error')
+            return redirect(url_for('admin.emoji_data'))
         
         # 计算日期范围
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        # 获取数据
-        records = EmojiRecord.export_records(mysql, course_id=course_id,
-                                           start_date=start_date, end_date=end_date)
-        
-        # 转换为DataFrame
-        df = pd.DataFrame(records)
-        
-        if df.empty:
+        # 汇总表中的总数即为导出行数，用于判断是否有数据和计算进度
+        total = EmojiRecord.get_statistics(mysql, course_id=course_id,
+                                           start_date=start_date, end_date=end_date,
+                                           version=EmojiRecord.get_data_version(mysql, course_id)[0])['total']
+        if not total:
             flash('没有可导出的数据', 'warning')
             return redirect(url_for('admin.emoji_data'))
         
-        # 创建Excel文件
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='表情数据')
-        output.seek(0)
-        
         # 生成文件名
-        filename = f'emoji_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+        mimetype, ext = EXPORT_FORMATS[fmt]
+        filename = f'emoji_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{ext}'
+        
+        app = current_app._get_current_object()
+        
+        def produce(job, fileobj, progress):
+            """在导出线程中运行：服务端游标分块读取并写入文件"""
+            with app.app_context():
+                started = time.perf_counter()
+                chunks = EmojiRecord.iter_export_records(mysql, course_id=course_id,
+                                                         start_date=start_date, end_date=end_date)
+                write_export(fmt, count_rows(chunks, progress), fileobj)
+                observe_export(fmt, fileobj.tell(), time.perf_counter() - started)
+        
+        key = (fmt, course_id, str(start_date), str(end_date))
+        job = export_jobs.submit(key, fmt, filename, mimetype, current_user.id, total, produce)
+        
+        if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+            return jsonify(export_job_status(job)), 202
+        return redirect(url_for('admin.export_job', job_id=job.id))
+    
+    @admin_bp.route('/export/<job_id>')
+    @login_required
+    @admin_or_teacher_required
+    def export_job(job_id):
+        """导出任务进度页面"""
+        job = load_export_job(job_id)
+        return render_template('admin/export_job.html', job=export_job_status(job))
+    
+    @admin_bp.route('/api/export/<job_id>')
+    @login_required
+    @admin_or_teacher_required
+    def api_export_job(job_id):
+        """导出任务状态API"""
+        return jsonify(export_job_status(load_export_job(job_id)))
+    
+    @admin_bp.route('/export/<job_id>/download')
+    @login_required
+    @admin_or_teacher_required
+    def download_export(job_id):
+        """下载导出文件（支持断点续传）"""
+        job = load_export_job(job_id)
+        if job.status != 'done':
+            flash('导出尚未完成', 'warning')
+            return redirect(url_for('admin.export_job', job_id=job.id))
+        return send_file(export_jobs.file_path(job), mimetype=job.mimetype, as_attachment=True,
+                         download_name=job.filename, conditional=True, max_age=0)
+    
+    @admin_bp.route('/api/live')
+    @login_required
+    @admin_or_teacher_required
+    def api_live():
+        """实时推送（SSE）：每次提交后推送一条计数增量
+        
+        不使用 stream_with_context，请求上下文（及数据库连接）在开始推送前即释放，
+        长连接只占用订阅队列
+        """
+        course_id = request.args.get('course_id', None, type=int)
+        channel = f'course:{course_id}' if course_id else 'course:all'
+        subscription = EmojiRecord.live_feed.subscribe(channel)
+        keepalive = Config.LIVE_FEED_KEEPALIVE
+        
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    event = subscription.get(timeout=keepalive)
+                    if event is None:
+                        yield ': keepalive\n\n'
+                    else:
+                        yield f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
+            finally:
+                subscription.close()
         
-        return send_file(output, 
-                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                        as_attachment=True,
-                        download_name=filename)
+        return Response(generate(),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
     
     @admin_bp.route('/api/chart_data')
     @login_required
     @admin_or_teacher_required
     def api_chart_data():
-        """获取图表数据API"""
+        """获取图表数据API（数据未变化时返回 304 或缓存的响应）"""
         course_id = request.args.get('course_id', None, type=int)
         days = request.args.get('days', 30, type=int)
         
@@ -181,28 +406,33 @@ def init_admin_routes(mysql):
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        # 获取统计数据
-        stats = EmojiRecord.get_statistics(mysql, course_id=course_id,
-                                          start_date=start_date, end_date=end_date)
-        
-        # 格式化数据
-        emoji_labels = [item['emoji_name'] for item in stats['emoji_stats']]
-        emoji_values = [item['count'] for item in stats['emoji_stats']]
+        version, updated_at = EmojiRecord.get_data_version(mysql, course_id)
+        etag = make_etag('chart_data', version, course_id, days, end_date, current_user.role)
+        return response_cache.respond(etag, window_last_modified(updated_at, end_date),
+                                      lambda: build_chart_data(course_id, start_date, end_date, version),
+                                      mimetype='application/json')
+    
+    @admin_bp.route('/api/heatmap')
+    @login_required
+    @admin_or_teacher_required
+    def api_heatmap():
+        """获取 (星期, 时段) 表情热力图数据API（数据未变化时返回 304 或缓存的响应）"""
+        course_id = request.args.get('course_id', None, type=int)
+        days = request.args.get('days', 30, type=int)
+        slot_minutes = request.args.get('slot', 30, type=int)
+        if slot_minutes not in HEATMAP_SLOT_MINUTES:
+            return jsonify({'error': f'slot 只能为 {", ".join(map(str, HEATMAP_SLOT_MINUTES))}'}), 400
         
-        date_labels = [str(item['session_date']) for item in stats['date_stats']]
-        date_values = [item['count'] for item in stats['date_stats']]
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days)
         
-        return jsonify({
-            'emoji_chart': {
-                'labels': emoji_labels,
-                'values': emoji_values
-            },
-            'date_chart': {
-                'labels': date_labels,
-                'values': date_values
-            },
-            'total': stats['total']
-        })
+        version, updated_at = EmojiRecord.get_data_version(mysql, course_id)
+        etag = make_etag('heatmap', version, course_id, days, slot_minutes, end_date, current_user.role)
+        return response_cache.respond(
+            etag, window_last_modified(updated_at, end_date),
+            lambda: jsonify(EmojiRecord.get_heatmap(mysql, course_id=course_id, start_date=start_date,
+                                                    end_date=end_date, slot_minutes=slot_minutes)).get_data(),
+            mimetype='application/json')
     
     return admin_bp
 
@@ -1,7 +1,8 @@
 """认证相关路由"""
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
-from models.user import User
+from models.user import User, login_throttle
+from models.summary import SystemSummary
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -24,9 +25,18 @@ def init_auth_routes(mysql):
             username = request.form.get('username')
             password = request.form.get('password')
             
+            # 连续失败过多的用户名直接拒绝，不再计算密码哈希
+            if login_throttle.is_blocked(username):
+                flash('登录失败次数过多，请稍后再试', 'error')
+                return render_template('login.html')
+            
             user = User.get_by_username(mysql, username)
             
             if user and user.check_password(password):
+                login_throttle.reset(username)
+                # 哈希参数已调整时，用本次登录的明文密码重新哈希
+                if user.needs_rehash():
+                    User.update_password(mysql, user.id, password)
                 login_user(user, remember=True)
                 flash('登录成功！', 'success')
                 
@@ -36,6 +46,7 @@ def init_auth_routes(mysql):
                 else:
                     return redirect(url_for('student.dashboard'))
             else:
+                login_throttle.record_failure(username)
                 flash('用户名或密码错误', 'error')
         
         return render_template('login.html')
@@ -68,6 +79,7 @@ def init_auth_routes(mysql):
             # 创建用户
             try:
                 User.create_user(mysql, username, password, role, full_name, email)
+                SystemSummary.invalidate()
                 flash('注册成功！请登录', 'success')
                 return redirect(url_for('auth.login'))
             except Exception as e:
@@ -93,7 +105,7 @@ def init_auth_routes(mysql):
             confirm_password = request.form.get('confirm_password')
             
             # 验证旧密码
-            if not current_user.check_password(old_password):
+            if not current_user.check_password(old_password, mysql):
                 flash('原密码错误', 'error')
                 return render_template('change_password.html')
             
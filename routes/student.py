@@ -2,12 +2,25 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
+from datetime import datetime, timedelta, timezone
+import re
+import pymysql
 from models.course import Course
 from models.emoji_record import EmojiRecord
+from models.summary import SystemSummary
 from config import Config
+from utils.idempotency import PENDING, SubmissionTokens
+from utils.pagination import decode_cursor, paginate
+from utils.metrics import EMOJI_SUBMISSIONS, EMOJI_DUPLICATES
 
 student_bp = Blueprint('student', __name__, url_prefix='/student')
 
+# 表情表单提交令牌（重复提交直接返回首次提交的结果），共享后端由 app.py 根据配置设置
+submission_tokens = SubmissionTokens(maxsize=Config.SUBMISSION_TOKEN_CACHE_SIZE, ttl=Config.SUBMISSION_TOKEN_TTL)
+
+# 批量提交的幂等键：客户端生成的 UUID 等（1-64 个字母、数字或 -_.:）
+_CLIENT_KEY = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+
 def student_required(f):
     """学生权限装饰器"""
     @wraps(f)
@@ -18,9 +31,65 @@ def student_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def parse_client_time(value, now):
+    """解析客户端提交时间（ISO 8601 字符串或 Unix 时间戳），返回服务器本地时间
+    
+    未带时区的时间视为服务器本地时间；早于 BATCH_MAX_AGE_DAYS 天或超前超过 BATCH_CLOCK_SKEW 秒时抛出 ValueError
+    """
+    if value is None:
+        return now
+    if isinstance(value, bool):
+        raise ValueError('时间格式不正确')
+    if isinstance(value, (int, float)):
+        moment = datetime.fromtimestamp(value, timezone.utc)
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.endswith(('Z', 'z')):
+            text = text[:-1] + '+00:00'
+        moment = datetime.fromisoformat(text)
+    else:
+        raise ValueError('时间格式不正确')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    
+    if moment > now + timedelta(seconds=Config.BATCH_CLOCK_SKEW):
+        raise ValueError('时间晚于服务器当前时间')
+    if moment < now - timedelta(days=Config.BATCH_MAX_AGE_DAYS):
+        raise ValueError(f'只能提交最近 {Config.BATCH_MAX_AGE_DAYS} 天内的反馈')
+    return min(moment, now)
+
+def parse_submission(item, now):
+    """校验批量提交中的一项，返回 (幂等键, 课程ID, 表情, 时间, 备注)；不合法时抛出 ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError('格式不正确')
+    client_key = item.get('client_key')
+    if not isinstance(client_key, str) or not _CLIENT_KEY.match(client_key):
+        raise ValueError('缺少或无效的 client_key')
+    course_id = item.get('course_id')
+    if isinstance(course_id, bool) or not isinstance(course_id, (int, str)) or not str(course_id).isdigit():
+        raise ValueError('缺少或无效的 course_id')
+    emoji = item.get('emoji')
+    if emoji not in Config.EMOJI_NAMES:
+        raise ValueError('不支持的表情')
+    comment = item.get('comment') or ''
+    if not isinstance(comment, str):
+        raise ValueError('comment 必须为字符串')
+    try:
+        moment = parse_client_time(item.get('client_time'), now)
+    except (ValueError, OverflowError, OSError) as e:
+        raise ValueError(f'client_time 无效：{e}')
+    return client_key, int(course_id), emoji, moment, comment
+
 def init_student_routes(mysql):
     """初始化学生路由"""
     
+    def load_history_page(cursor_token):
+        """按键集分页读取当前学生的一页历史记录，返回 (记录, 下一页游标)"""
+        page_size = Config.RECORDS_PER_PAGE
+        records = EmojiRecord.get_user_records(mysql, current_user.id, limit=page_size + 1,
+                                               after=decode_cursor(cursor_token, 1))
+        return paginate(records, page_size, ('id',))
+    
     @student_bp.route('/dashboard')
     @login_required
     @student_required
@@ -35,8 +104,7 @@ def init_student_routes(mysql):
     def courses():
         """查看所有可选课程"""
         all_courses = Course.get_all_courses(mysql)
-        enrolled_courses = Course.get_student_courses(mysql, current_user.id)
-        enrolled_ids = [c['id'] for c in enrolled_courses]
+        enrolled_ids = Course.get_enrolled_course_ids(mysql, current_user.id)
         
         return render_template('student/courses.html', 
                              courses=all_courses, 
@@ -51,6 +119,7 @@ def init_student_routes(mysql):
             flash('您已经选过这门课程了', 'warning')
         else:
             if Course.enroll_student(mysql, current_user.id, course_id):
+                SystemSummary.invalidate()
                 flash('选课成功！', 'success')
             else:
                 flash('选课失败', 'error')
@@ -66,24 +135,44 @@ def init_student_routes(mysql):
             course_id = request.form.get('course_id')
             emoji = request.form.get('emoji')
             comment = request.form.get('comment', '')
+            token = request.form.get('submission_token')
             
             # 验证
             if not course_id or not emoji:
                 flash('请选择课程和表情', 'error')
                 return redirect(url_for('student.send_emoji'))
             
-            # 检查是否已选该课程
-            if not Course.is_student_enrolled(mysql, current_user.id, int(course_id)):
-                flash('您未选择该课程，无法提交评价', 'error')
-                return redirect(url_for('student.send_emoji'))
+            # 重复提交（连续点击、浏览器重试）直接返回首次提交的结果，不访问数据库
+            previous = submission_tokens.begin(current_user.id, token)
+            if previous is not None:
+                EMOJI_DUPLICATES.inc('form')
+                if previous == PENDING:
+                    flash('您的反馈正在提交，请勿重复提交', 'info')
+                    return redirect(url_for('student.history'))
+                flash(previous['message'], previous['category'])
+                return redirect(url_for(previous['endpoint']))
             
-            # 获取表情名称
-            emoji_name = Config.EMOJI_NAMES.get(emoji, '未知')
+            try:
+                # 检查是否已选该课程
+                if not Course.is_student_enrolled(mysql, current_user.id, int(course_id)):
+                    outcome = {'category': 'error', 'message': '您未选择该课程，无法提交评价',
+                               'endpoint': 'student.send_emoji'}
+                else:
+                    # 获取表情名称
+                    emoji_name = Config.EMOJI_NAMES.get(emoji, '未知')
+                    
+                    # 创建记录
+                    EmojiRecord.create_record(mysql, current_user.id, course_id, emoji, emoji_name, comment)
+                    EMOJI_SUBMISSIONS.inc(int(course_id))
+                    outcome = {'category': 'success', 'message': '表情提交成功！感谢您的反馈',
+                               'endpoint': 'student.history'}
+            except Exception:
+                submission_tokens.release(current_user.id, token)
+                raise
             
-            # 创建记录
-            EmojiRecord.create_record(mysql, current_user.id, course_id, emoji, emoji_name, comment)
-            flash('表情提交成功！感谢您的反馈', 'success')
-            return redirect(url_for('student.history'))
+            submission_tokens.finish(current_user.id, token, outcome)
+            flash(outcome['message'], outcome['category'])
+            return redirect(url_for(outcome['endpoint']))
         
         # GET请求
         courses = Course.get_student_courses(mysql, current_user.id)
@@ -93,15 +182,98 @@ def init_student_routes(mysql):
         return render_template('student/send_emoji.html', 
                              courses=courses,
                              emoji_list=emoji_list,
-                             emoji_names=emoji_names)
+                             emoji_names=emoji_names,
+                             submission_token=submission_tokens.issue())
+    
+    @student_bp.route('/api/emoji/batch', methods=['POST'])
+    @login_required
+    @student_required
+    def api_submit_batch():
+        """批量提交表情（教室平板、离线客户端同步）
+        
+        请求体为 {"submissions": [{"client_key", "course_id", "emoji", "comment", "client_time"}, ...]}，
+        按 client_key 去重，重复同步同一批数据是安全的；返回与请求顺序一致的逐条结果
+        """
+        data = request.get_json(silent=True)
+        items = data.get('submissions') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return jsonify({'error': '请求体应为 {"submissions": [...]}'}), 400
+        if len(items) > Config.BATCH_SUBMIT_MAX:
+            return jsonify({'error': f'每次最多提交 {Config.BATCH_SUBMIT_MAX} 条'}), 413
+        
+        now = datetime.now()
+        results = [None] * len(items)
+        accepted = {}
+        for index, item in enumerate(items):
+            key = item.get('client_key') if isinstance(item, dict) else None
+            try:
+                parsed = parse_submission(item, now)
+            except ValueError as e:
+                results[index] = {'client_key': key, 'status': 'rejected', 'error': str(e)}
+                continue
+            if parsed[0] in accepted:
+                results[index] = {'client_key': key, 'status': 'duplicate'}
+                continue
+            accepted[parsed[0]] = (index, parsed)
+        
+        # 整批只查询一次选课关系
+        enrolled = Course.get_enrolled_among(mysql, current_user.id,
+                                             {parsed[1] for _, parsed in accepted.values()}) if accepted else set()
+        for key, (index, parsed) in list(accepted.items()):
+            if parsed[1] not in enrolled:
+                results[index] = {'client_key': key, 'status': 'rejected', 'error': '未选该课程'}
+                del accepted[key]
+        
+        # 并发重复同步时幂等键写入冲突，整批回滚后重新排除已提交的键再写一次
+        for attempt in range(2):
+            for key in EmojiRecord.get_submitted_keys(mysql, current_user.id, accepted):
+                index, _ = accepted.pop(key)
+                results[index] = {'client_key': key, 'status': 'duplicate'}
+            if not accepted:
+                break
+            submissions = [(current_user.id, course_id, emoji, Config.EMOJI_NAMES[emoji],
+                            moment.date(), moment.time(), comment)
+                           for _, (_, course_id, emoji, moment, comment) in accepted.values()]
+            try:
+                EmojiRecord.create_records(mysql, submissions,
+                                           client_keys=[(current_user.id, key) for key in accepted])
+                break
+            except pymysql.err.IntegrityError:
+                if attempt:
+                    raise
+        
+        for key, (index, parsed) in accepted.items():
+            results[index] = {'client_key': key, 'status': 'created'}
+            EMOJI_SUBMISSIONS.inc(parsed[1])
+        
+        summary = {status: sum(1 for result in results if result['status'] == status)
+                   for status in ('created', 'duplicate', 'rejected')}
+        if summary['duplicate']:
+            EMOJI_DUPLICATES.inc('batch', amount=summary['duplicate'])
+        return jsonify(dict(summary, results=results))
     
     @student_bp.route('/history')
     @login_required
     @student_required
     def history():
         """查看历史记录"""
-        records = EmojiRecord.get_user_records(mysql, current_user.id)
-        return render_template('student/history.html', records=records)
+        cursor_token = request.args.get('cursor')
+        records, next_cursor = load_history_page(cursor_token)
+        return render_template('student/history.html',
+                             records=records,
+                             is_first_page=not cursor_token,
+                             next_cursor=next_cursor)
+    
+    @student_bp.route('/api/history')
+    @login_required
+    @student_required
+    def api_history():
+        """历史记录分页API"""
+        records, next_cursor = load_history_page(request.args.get('cursor'))
+        return jsonify({
+            'records': [EmojiRecord.serialize(record) for record in records],
+            'next_cursor': next_cursor
+        })
     
     return student_bp
 
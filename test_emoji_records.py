@@ -0,0 +1,132 @@
+"""表情记录写入与汇总的数据库测试
+
+在临时数据库（与查询计划测试相同，按 init.sql 建表）中通过模型方法写入记录，
+检查写入结果和统计查询。需要可连接的 MySQL，无法连接时标记为跳过。
+
+    python test_emoji_records.py
+"""
+import sys
+from datetime import date, time
+
+import pymysql
+import pytest
+from test_query_plans import TEST_DB, RecordingMySQL, create_schema
+from models.emoji_record import EmojiRecord
+from models.emoji_rollup import EmojiRollup
+
+# init.sql 中的示例学生和课程
+STUDENTS = (3, 4)
+COURSE_ID = 1
+
+
+@pytest.fixture
+def mysql():
+    try:
+        conn = create_schema()
+    except pymysql.err.OperationalError as e:
+        pytest.skip(f"无法连接MySQL，跳过表情记录测试: {e}")
+    try:
+        yield RecordingMySQL(conn)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+        conn.close()
+
+
+def query(mysql, sql, params=()):
+    cursor = mysql.connection.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def test_batch_links_records_to_submitters(mysql):
+    """批量写入时每位学生关联到自己提交的记录"""
+    today = date.today()
+    submissions = [(STUDENTS[i % 2], COURSE_ID, emoji, name, today, time(9, 0, i), f'comment {i}')
+                   for i, (emoji, name) in enumerate([('😊', '开心'), ('😕', '困惑'), ('🤔', '思考'), ('😐', '一般')])]
+    record_ids = EmojiRecord.create_records(mysql, submissions)
+
+    assert len(set(record_ids)) == len(submissions)
+    rows = query(mysql, """SELECT uer.user_id, er.id, er.comment FROM user_emoji_records uer
+                           JOIN emoji_records er ON er.id = uer.emoji_record_id""")
+    linked = {(row['user_id'], row['id'], row['comment']) for row in rows}
+    expected = {(user_id, record_id, comment)
+                for (user_id, _, _, _, _, _, comment), record_id in zip(submissions, record_ids)}
+    assert linked == expected
+
+
+
+def daily_rows(mysql, session_date):
+    return query(mysql, """SELECT emoji, emoji_name, count FROM emoji_daily_stats
+                           WHERE course_id = %s AND session_date = %s ORDER BY emoji_name""",
+                 (COURSE_ID, session_date))
+
+
+def test_rollup_keeps_emojis_apart(mysql):
+    """同一课程同一天的不同表情在日汇总表中各占一行（增量更新和重建都一样）"""
+    today = date.today()
+    EmojiRecord.create_record(mysql, STUDENTS[0], COURSE_ID, '😊', '开心')
+    EmojiRecord.create_record(mysql, STUDENTS[1], COURSE_ID, '🤔', '思考')
+    EmojiRecord.create_record(mysql, STUDENTS[1], COURSE_ID, '😊', '开心')
+
+    expected = [{'emoji': '😊', 'emoji_name': '开心', 'count': 2},
+                {'emoji': '🤔', 'emoji_name': '思考', 'count': 1}]
+    assert daily_rows(mysql, today) == expected
+
+    EmojiRollup.rebuild(mysql, COURSE_ID)
+    assert daily_rows(mysql, today) == expected
+
+
+
+def test_statistics_per_emoji(mysql):
+    """统计结果按表情分别计数（不同表情不会合并为一项）"""
+    today = date.today()
+    for user_id, emoji, name in [(STUDENTS[0], '😊', '开心'), (STUDENTS[1], '😊', '开心'),
+                                 (STUDENTS[0], '😕', '困惑'), (STUDENTS[1], '🤔', '思考')]:
+        EmojiRecord.create_record(mysql, user_id, COURSE_ID, emoji, name)
+
+    stats = EmojiRollup.get_statistics(mysql, COURSE_ID, today, today)
+    assert stats['total'] == 4
+    assert [(item['emoji'], item['count']) for item in stats['emoji_stats']][0] == ('😊', 2)
+    assert sorted((item['emoji_name'], item['count']) for item in stats['emoji_stats']) == \
+        [('困惑', 1), ('开心', 2), ('思考', 1)]
+    assert sorted((row['emoji_name'], row['count']) for row in stats['daily_emoji_stats']) == \
+        [('困惑', 1), ('开心', 2), ('思考', 1)]
+    assert [item['count'] for item in stats['date_stats']] == [4]
+
+
+
+def test_heatmap_per_emoji(mysql):
+    """热力图按表情分别计数"""
+    today = date.today()
+    for user_id, emoji, name in [(STUDENTS[0], '😊', '开心'), (STUDENTS[1], '😊', '开心'),
+                                 (STUDENTS[0], '🤔', '思考')]:
+        EmojiRecord.create_record(mysql, user_id, COURSE_ID, emoji, name)
+
+    heatmap = EmojiRecord.get_heatmap(mysql, COURSE_ID, today, today, slot_minutes=120)
+    assert heatmap['emojis'] == ['😊', '🤔']
+    assert [sum(map(sum, series)) for series in heatmap['counts']] == [2, 1]
+    assert heatmap['total'] == 3
+
+
+
+def test_data_version_without_version_writes(mysql):
+    """提交表情会改变课程和全部课程的数据版本，但不写全局版本表；重建汇总后版本也会改变"""
+    before = {course: EmojiRecord.get_data_version(mysql, course)[0] for course in (COURSE_ID, 2, None)}
+    rebuilds = query(mysql, "SELECT version FROM data_versions WHERE name = 'emoji'")
+
+    EmojiRecord.create_record(mysql, STUDENTS[0], COURSE_ID, '😊', '开心')
+    after = {course: EmojiRecord.get_data_version(mysql, course)[0] for course in (COURSE_ID, 2, None)}
+    assert after[COURSE_ID] != before[COURSE_ID]
+    assert after[None] != before[None]
+    assert after[2] == before[2]
+    assert query(mysql, "SELECT version FROM data_versions WHERE name = 'emoji'") == rebuilds
+
+    EmojiRollup.rebuild(mysql)
+    assert EmojiRecord.get_data_version(mysql, 2)[0] != after[2]
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-q', '-rs']))
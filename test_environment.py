@@ -20,7 +20,7 @@ def test_imports():
         'flask_mysqldb': 'Flask-MySQLdb',
         'flask_login': 'Flask-Login',
         'werkzeug': 'Werkzeug',
-        'pandas': 'Pandas'
+        'openpyxl': 'openpyxl'
     }
     
     all_ok = True
@@ -0,0 +1,77 @@
+"""表单提交令牌测试
+
+以两个共享同一后端的 SubmissionTokens 模拟两个 worker 进程，检查重复提交在
+处理中、完成和释放后的响应。
+
+    python test_idempotency.py
+"""
+import sys
+
+from utils.cache import LocalBackend
+from utils.idempotency import PENDING, SubmissionTokens
+
+
+def make_workers():
+    backend = LocalBackend()
+    return SubmissionTokens(backend=backend), SubmissionTokens(backend=backend)
+
+
+def test_duplicate_sees_finish_from_other_worker():
+    """其它 worker 完成后，重复提交得到保存的结果而不是 PENDING"""
+    first, second = make_workers()
+    token = SubmissionTokens.issue()
+    outcome = {'category': 'success', 'message': '提交成功', 'endpoint': 'student.dashboard'}
+
+    assert first.begin(1, token) is None
+    assert second.begin(1, token) == PENDING
+    first.finish(1, token, outcome)
+    assert second.begin(1, token) == outcome
+    assert first.begin(1, token) == outcome
+
+
+def test_retry_after_release_on_other_worker():
+    """首次处理失败释放令牌后，其它 worker 上的重试按首次提交处理"""
+    first, second = make_workers()
+    token = SubmissionTokens.issue()
+
+    assert first.begin(1, token) is None
+    assert second.begin(1, token) == PENDING
+    first.release(1, token)
+    assert second.begin(1, token) is None
+    assert first.begin(1, token) == PENDING
+
+
+def test_tokens_are_per_owner():
+    """令牌按用户区分；未携带令牌时不做去重"""
+    first, second = make_workers()
+    token = SubmissionTokens.issue()
+
+    assert first.begin(1, token) is None
+    assert second.begin(2, token) is None
+    assert first.begin(1, '') is None
+    assert first.begin(1, '') is None
+
+
+def test_without_backend():
+    """未设置共享后端时在进程内去重"""
+    tokens = SubmissionTokens()
+    token = SubmissionTokens.issue()
+
+    assert tokens.begin(1, token) is None
+    assert tokens.begin(1, token) == PENDING
+    tokens.finish(1, token, {'category': 'success'})
+    assert tokens.begin(1, token) == {'category': 'success'}
+    tokens.release(1, token)
+    assert tokens.begin(1, token) is None
+
+
+if __name__ == '__main__':
+    try:
+        test_duplicate_sees_finish_from_other_worker()
+        test_retry_after_release_on_other_worker()
+        test_tokens_are_per_owner()
+        test_without_backend()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print('提交令牌测试通过')
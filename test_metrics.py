@@ -0,0 +1,33 @@
+"""/metrics 输出测试
+
+    python test_metrics.py
+"""
+import sys
+
+from app import app
+from utils.metrics import EMOJI_SUBMISSIONS, EXPORT_DURATION
+
+
+def test_metrics_have_no_duplicate_series():
+    """同一标签值以 int 和 str 传入时合并为一条序列（表单提交与批量接口的课程ID类型不同）"""
+    EMOJI_SUBMISSIONS.inc('3')
+    EMOJI_SUBMISSIONS.inc(3)
+    EXPORT_DURATION.observe(0.2, 'csv')
+
+    response = app.test_client().get('/metrics')
+    assert response.status_code == 200
+
+    series = [line.rsplit(' ', 1)[0] for line in response.get_data(as_text=True).splitlines()
+              if line and not line.startswith('#')]
+    duplicates = sorted({name for name in series if series.count(name) > 1})
+    assert not duplicates, f'重复的指标序列: {duplicates}'
+    assert 'emoji_submissions_total{course_id="3"}' in series
+
+
+if __name__ == '__main__':
+    try:
+        test_metrics_have_no_duplicate_series()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print('/metrics 输出检查通过')
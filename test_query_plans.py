@@ -0,0 +1,243 @@
+"""查询计划回归测试
+
+在临时数据库中按 init.sql 建表、写入种子数据，然后对各模型查询执行 EXPLAIN，
+出现全表扫描（type=ALL）或文件排序（Using filesort）即判定失败。
+
+    python test_query_plans.py
+
+需要可连接的 MySQL（使用 config.py 中的连接配置，测试库名为 <MYSQL_DB>_plan_test）；
+无法连接时标记为跳过（skipped），不算通过。
+
+检查范围是按主键、索引查找或过滤的查询（记录列表、统计、导出、登录、选课等）；
+返回整张表的管理列表（User.get_all_users 不带角色、Course.get_all_courses 不带教师）
+按设计全表读取，不在检查范围内。
+"""
+import os
+import random
+import sys
+from datetime import date, time, timedelta
+
+import pymysql
+import pytest
+from config import Config
+from models.course import Course, enrollment_cache
+from models.emoji_record import EmojiRecord
+from models.emoji_rollup import EmojiRollup
+from models.user import User, user_cache
+from utils.migrations import migrate, split_statements
+
+TEST_DB = Config.MYSQL_DB + '_plan_test'
+INIT_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'init.sql')
+
+COURSES = 20
+STUDENTS = 200
+RECORDS = 20000
+DAYS = 180
+
+
+class _RecordingConnection:
+    """记录执行过的 SELECT 语句的连接代理"""
+
+    def __init__(self, conn, queries):
+        self._conn = conn
+        self._queries = queries
+
+    def cursor(self, *args):
+        cursor = self._conn.cursor(*args)
+        execute = cursor.execute
+
+        def recording_execute(sql, params=None):
+            if sql.lstrip().upper().startswith('SELECT'):
+                self._queries.append((sql, params))
+            return execute(sql, params)
+
+        cursor.execute = recording_execute
+        return cursor
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class RecordingMySQL:
+    """MySQLAdapter 替身：模型通过它执行查询，同时记录查询语句"""
+
+    def __init__(self, conn):
+        self.queries = []
+        self.connection = _RecordingConnection(conn, self.queries)
+
+
+def connect(database=None):
+    """连接测试用 MySQL"""
+    return pymysql.connect(
+        host=Config.MYSQL_HOST,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        database=database,
+        cursorclass=pymysql.cursors.DictCursor,
+        charset='utf8mb4'
+    )
+
+
+def create_schema():
+    """按 init.sql 创建测试库，并确认所有迁移都已登记"""
+    with open(INIT_SQL, encoding='utf-8') as f:
+        sql = f.read().replace('emoji_checker_db', TEST_DB)
+
+    conn = connect()
+    with conn.cursor() as cursor:
+        for statement in split_statements(sql):
+            cursor.execute(statement)
+    conn.commit()
+    conn.close()
+
+    conn = connect(TEST_DB)
+    pending = migrate(conn, log=lambda message: None)
+    assert not pending, f'init.sql 未包含迁移: {pending}'
+    return conn
+
+
+def seed(conn):
+    """写入种子数据并更新索引统计信息"""
+    rng = random.Random(42)
+    today = date.today()
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO users (username, password_hash, role) VALUES (%s, 'x', 'student')",
+            [(f'plan_student_{i}',) for i in range(STUDENTS)])
+        cursor.execute("SELECT id FROM users WHERE role = 'student'")
+        student_ids = [row['id'] for row in cursor.fetchall()]
+
+        cursor.executemany(
+            "INSERT INTO courses (course_name, course_code, teacher_id) VALUES (%s, %s, 2)",
+            [(f'课程{i}', f'PLAN{i:03d}') for i in range(COURSES)])
+        cursor.execute("SELECT id FROM courses")
+        course_ids = [row['id'] for row in cursor.fetchall()]
+
+        cursor.executemany(
+            "INSERT IGNORE INTO user_courses (user_id, course_id) VALUES (%s, %s)",
+            [(user_id, rng.choice(course_ids)) for user_id in student_ids for _ in range(3)])
+
+        for offset in range(0, RECORDS, 1000):
+            rows = []
+            for _ in range(min(1000, RECORDS - offset)):
+                emoji = rng.choice(Config.EMOJI_LIST)
+                rows.append((rng.choice(course_ids), emoji, Config.EMOJI_NAMES[emoji],
+                             today - timedelta(days=rng.randrange(DAYS)),
+                             time(rng.randrange(8, 20), rng.randrange(60), rng.randrange(60))))
+            cursor.executemany(
+                """INSERT INTO emoji_records (course_id, emoji, emoji_name, session_date, session_time)
+                   VALUES (%s, %s, %s, %s, %s)""", rows)
+        cursor.execute("SELECT id FROM emoji_records")
+        cursor.executemany(
+            "INSERT INTO user_emoji_records (user_id, emoji_record_id) VALUES (%s, %s)",
+            [(rng.choice(student_ids), row['id']) for row in cursor.fetchall()])
+    conn.commit()
+
+    EmojiRollup.rebuild(RecordingMySQL(conn))
+    with conn.cursor() as cursor:
+        for table in ('users', 'courses', 'user_courses', 'emoji_records',
+                      'user_emoji_records', 'emoji_daily_stats'):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+    return student_ids[0], course_ids[0]
+
+
+def collect_queries(conn, user_id, course_id):
+    """通过模型方法收集需要检查的查询：[(说明, SQL, 参数)]"""
+    today = date.today()
+    start = today - timedelta(days=30)
+    cases = {
+        '学生历史记录': lambda m: EmojiRecord.get_user_records(m, user_id, limit=51),
+        '学生历史记录（翻页）': lambda m: EmojiRecord.get_user_records(m, user_id, limit=51, after=[10 ** 9]),
+        '课程记录': lambda m: EmojiRecord.get_course_records(m, course_id, limit=51),
+        '课程记录（翻页）': lambda m: EmojiRecord.get_course_records(
+            m, course_id, limit=51, after=[str(start), '12:00:00', 10 ** 9]),
+        '课程记录（日期范围）': lambda m: EmojiRecord.get_course_records(m, course_id, start, today, limit=51),
+        '全部记录': lambda m: EmojiRecord.get_all_records(m, limit=51),
+        '全部记录（翻页）': lambda m: EmojiRecord.get_all_records(m, limit=51, after=[10 ** 9]),
+        '课程统计': lambda m: EmojiRecord.get_statistics(m, course_id, start, today),
+        '全部课程统计': lambda m: EmojiRecord.get_statistics(m, None, start, today),
+        '课程热力图': lambda m: EmojiRecord.get_heatmap(m, course_id, start, today),
+        '全部课程热力图': lambda m: EmojiRecord.get_heatmap(m, None, start, today),
+        '课程数据版本': lambda m: EmojiRecord.get_data_version(m, course_id),
+        '全部课程数据版本': lambda m: EmojiRecord.get_data_version(m),
+        '课程列表版本': lambda m: Course.get_list_version(m),
+        '课程导出': lambda m: EmojiRecord.export_records(m, course_id, start, today),
+        '全部课程导出': lambda m: EmojiRecord.export_records(m, None, start, today),
+        '用户角色计数': lambda m: User.count_by_role(m),
+        '课程计数': lambda m: Course.count_courses(m),
+        '批量提交选课检查': lambda m: Course.get_enrolled_among(m, user_id, [course_id, course_id + 1]),
+        '批量提交幂等键': lambda m: EmojiRecord.get_submitted_keys(m, user_id, ['k1', 'k2']),
+        '选课人数': lambda m: Course.get_enrollment_counts(m, [course_id]),
+        '全部选课人数': lambda m: Course.get_enrollment_counts(m),
+        '按ID查询用户': lambda m: User.get_by_id(m, user_id),
+        '登录查询用户': lambda m: User.get_by_username(m, 'plan_student_0'),
+        '读取密码哈希': lambda m: User.get_password_hash(m, user_id),
+        '按角色列出用户': lambda m: User.get_all_users(m, role='teacher'),
+        '按ID查询课程': lambda m: Course.get_by_id(m, course_id),
+        '教师课程列表': lambda m: Course.get_all_courses(m, teacher_id=2),
+        '教师课程计数': lambda m: Course.count_courses(m, teacher_id=2),
+        '学生已选课程': lambda m: Course.get_student_courses(m, user_id),
+        '学生选课索引': lambda m: Course.get_enrolled_course_ids(m, user_id),
+        '选课检查': lambda m: Course.is_student_enrolled(m, user_id, course_id),
+    }
+
+    queries = []
+    for label, run in cases.items():
+        # 清空进程内缓存，确保带缓存的模型方法都实际执行查询
+        enrollment_cache.clear()
+        user_cache.clear()
+        mysql = RecordingMySQL(conn)
+        run(mysql)
+        assert mysql.queries, f'{label}: 没有执行查询'
+        for sql, params in mysql.queries:
+            queries.append((label, sql, params))
+    return queries
+
+
+def check_plan(conn, label, sql, params):
+    """对单条查询执行 EXPLAIN，返回问题列表"""
+    problems = []
+    with conn.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        for row in cursor.fetchall():
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL':
+                problems.append(f"{label}: 表 {row['table']} 全表扫描")
+            if 'Using filesort' in extra:
+                problems.append(f"{label}: 表 {row['table']} 使用文件排序")
+    return problems
+
+
+def test_query_plans():
+    """所有模型查询都应走索引，不出现全表扫描和文件排序"""
+    try:
+        conn = create_schema()
+    except pymysql.err.OperationalError as e:
+        pytest.skip(f"无法连接MySQL，跳过查询计划测试: {e}")
+
+    try:
+        user_id, course_id = seed(conn)
+        problems = []
+        for label, sql, params in collect_queries(conn, user_id, course_id):
+            problems.extend(check_plan(conn, label, sql, params))
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+        conn.close()
+
+    assert not problems, '查询计划回归:\n' + '\n'.join(problems)
+    print("查询计划检查通过")
+
+
+if __name__ == '__main__':
+    try:
+        test_query_plans()
+    except pytest.skip.Exception as e:
+        print(e.msg)
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,82 @@
+"""启动开销回归测试
+
+在子进程中以 python -X importtime 导入 app，检查导入耗时和导入后的常驻内存是否超出预算，
+并确认 openpyxl、pyarrow 等只在导出/导入时才用到的重型依赖没有在启动时加载。
+
+    python test_startup.py
+
+预算可通过环境变量 STARTUP_IMPORT_BUDGET_MS、STARTUP_RSS_BUDGET_MB 调整（较慢的机器上适当放宽）。
+导入耗时取多次运行的最小值，减少磁盘缓存和机器负载造成的波动。
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS') or 1000)
+RSS_BUDGET_MB = float(os.environ.get('STARTUP_RSS_BUDGET_MB') or 80)
+RUNS = 3
+
+# 启动时不应加载的模块（按需在导出、名单导入等路径中导入）
+LAZY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'redis', 'multiprocessing')
+
+PROBE = """
+import json, sys
+import app
+rss = None
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+except ImportError:
+    pass
+print(json.dumps({'modules': sorted(sys.modules), 'rss_kb': rss}))
+"""
+
+
+def measure():
+    """导入 app 一次，返回 (导入耗时毫秒, 已加载模块, 峰值常驻内存 KB)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                            cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    import_us = None
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == 'app':
+            import_us = int(parts[1])
+    assert import_us is not None, '未找到 app 的导入耗时'
+
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return import_us / 1000, set(probe['modules']), probe['rss_kb']
+
+
+def test_startup_budget():
+    runs = [measure() for _ in range(RUNS)]
+    import_ms = min(run[0] for run in runs)
+    modules = runs[-1][1]
+    rss_kb = min(run[2] for run in runs) if runs[-1][2] else None
+
+    loaded = sorted(name for name in LAZY_MODULES if name in modules)
+    print(f'导入 app: {import_ms:.1f} ms（预算 {IMPORT_BUDGET_MS:.0f} ms）')
+    if rss_kb:
+        print(f'常驻内存: {rss_kb / 1024:.1f} MB（预算 {RSS_BUDGET_MB:.0f} MB）')
+
+    assert not loaded, f'启动时加载了应按需导入的模块: {", ".join(loaded)}'
+    assert import_ms <= IMPORT_BUDGET_MS, f'导入 app 耗时 {import_ms:.1f} ms，超出预算 {IMPORT_BUDGET_MS:.0f} ms'
+    if rss_kb:
+        assert rss_kb / 1024 <= RSS_BUDGET_MB, \
+            f'启动后常驻内存 {rss_kb / 1024:.1f} MB，超出预算 {RSS_BUDGET_MB:.0f} MB'
+
+
+if __name__ == '__main__':
+    try:
+        test_startup_budget()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print('启动开销在预算内')
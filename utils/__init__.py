@@ -0,0 +1 @@
+"""工具包"""
@@ -0,0 +1,212 @@
+"""进程内 LRU + TTL 缓存，可选共享缓存后端"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LocalBackend:
+    """共享缓存后端的本地替身
+
+    实现 Redis 客户端 get/set/delete 接口的子集（值为 bytes），
+    开发与测试时替代 Redis；生产环境可直接传入 redis.Redis 实例。
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None, nx=False):
+        now = time.monotonic()
+        expires_at = now + ex if ex else None
+        with self._lock:
+            if nx:
+                item = self._data.get(key)
+                if item is not None and (item[1] is None or item[1] > now):
+                    return None
+            self._data[key] = (value, expires_at)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+
+def create_backend(url):
+    """根据配置创建共享缓存后端；未配置时返回 None（仅使用进程内缓存）"""
+    if not url:
+        return None
+    if url == 'local://':
+        return LocalBackend()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('CACHE_BACKEND_URL 需要 redis 包，请执行: pip install redis')
+    return redis.Redis.from_url(url)
+
+
+class TTLCache:
+    """线程安全的 LRU + TTL 缓存
+
+    进程内缓存作为一级缓存；若设置了 backend（共享缓存），一级缓存未命中时
+    再查询共享缓存，写入与失效同时作用于两级。其它进程的一级缓存不会收到
+    失效通知，最多在 ttl 秒内仍可能返回旧值。
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, namespace='cache', backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self.backend = backend
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计数据
+        self._hits = 0
+        self._misses = 0
+        self._backend_hits = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _backend_key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def get(self, key, default=None, local=True):
+        """读取缓存值，未命中返回 default
+
+        local=False 且设置了共享后端时只读共享缓存，也不写入进程内缓存，
+        用于会被其它进程很快改写的值（进程内副本会一直保留到 ttl 过期）。
+        """
+        if not local and self.backend is not None:
+            try:
+                raw = self.backend.get(self._backend_key(key))
+            except Exception:
+                raw = None
+            with self._lock:
+                if raw is None:
+                    self._misses += 1
+                    return default
+                self._hits += 1
+                self._backend_hits += 1
+            return pickle.loads(raw)
+
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+                self._expirations += 1
+
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(self._backend_key(key))
+            except Exception:
+                raw = None
+            if raw is not None:
+                value = pickle.loads(raw)
+                self._store(key, value, self.ttl)
+                with self._lock:
+                    self._hits += 1
+                    self._backend_hits += 1
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """写入缓存值"""
+        ttl = ttl or self.ttl
+        self._store(key, value, ttl)
+        if self.backend is not None:
+            try:
+                self.backend.set(self._backend_key(key), pickle.dumps(value), ex=ttl)
+            except Exception:
+                pass
+
+    def add(self, key, value, ttl=None):
+        """键不存在时写入并返回 True，已存在时返回 False
+
+        设置了共享后端时只由后端判断（跨进程原子），不读写进程内缓存：
+        其它进程改写或删除该键后，本进程的旧副本不会影响结果。
+        """
+        ttl = ttl or self.ttl
+        if self.backend is not None:
+            try:
+                return bool(self.backend.set(self._backend_key(key), pickle.dumps(value), ex=ttl, nx=True))
+            except Exception:
+                # 共享后端不可用时退化为只在进程内判断
+                pass
+
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[1] > time.monotonic():
+                return False
+            self._insert(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        """使缓存值失效"""
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backend is not None:
+            try:
+                self.backend.delete(self._backend_key(key))
+            except Exception:
+                pass
+
+    def keys(self):
+        """进程内缓存中的键（快照，可能包含已过期的键）"""
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        """清空进程内缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """缓存统计（命中、未命中、命中率等）"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'backend_hits': self._backend_hits,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key, value, ttl):
+        with self._lock:
+            self._insert(key, value, ttl)
+
+    def _insert(self, key, value, ttl):
+        # 调用方需持有 self._lock
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
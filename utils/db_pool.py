@@ -0,0 +1,180 @@
+"""MySQL 连接池"""
+import threading
+import time
+
+
+class PoolExhaustedError(Exception):
+    """连接池已耗尽（等待超时）"""
+
+
+class _PoolEntry:
+    """连接池中的连接及其元数据"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """有界、线程安全的数据库连接池
+
+    - max_size: 最大连接数，超过后借用方阻塞等待（背压）
+    - timeout: 等待空闲连接的最长秒数，超时抛出 PoolExhaustedError
+    - recycle: 连接存活超过该秒数后在借出时重建，避免服务端 wait_timeout 断开
+    - ping_interval: 空闲超过该秒数的连接在借出前执行 ping 健康检查
+    """
+
+    def __init__(self, creator, max_size=10, timeout=5.0, recycle=3600, ping_interval=30):
+        self._creator = creator
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+
+        # 统计数据
+        self._acquires = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def acquire(self):
+        """借出一个连接"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # 预占名额，在锁外建立连接
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhaustedError(
+                        f'数据库连接池已耗尽（{self.max_size} 个连接均在使用中，等待 {self.timeout} 秒超时）')
+                waited = True
+                self._cond.wait(remaining)
+
+        try:
+            if entry is None:
+                entry = self._new_entry()
+            else:
+                entry = self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited_for = time.monotonic() - start
+        with self._cond:
+            self._in_use[id(entry.conn)] = entry
+            self._acquires += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += waited_for
+            self._wait_time_max = max(self._wait_time_max, waited_for)
+        return entry.conn
+
+    def release(self, conn, discard=False):
+        """归还连接；未提交的事务会被回滚，损坏的连接会被丢弃"""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            # 不属于本连接池的连接，直接关闭
+            self._close(conn)
+            return
+
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if discard:
+            self._close(conn)
+
+    def close_all(self):
+        """关闭所有空闲连接（进程退出时调用）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for entry in idle:
+            self._close(entry.conn)
+
+    def stats(self):
+        """连接池统计信息"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'acquires': self._acquires,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_avg': round(self._wait_time_total / self._acquires, 6) if self._acquires else 0.0,
+                'wait_time_max': round(self._wait_time_max, 6),
+            }
+
+    def _new_entry(self):
+        """建立新连接"""
+        entry = _PoolEntry(self._creator())
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def _validate(self, entry):
+        """借出前检查连接：超龄则重建，空闲过久则 ping"""
+        now = time.monotonic()
+        if self.recycle and now - entry.created_at > self.recycle:
+            self._close(entry.conn)
+            with self._cond:
+                self._discarded += 1
+            return self._new_entry()
+
+        if self.ping_interval is not None and now - entry.last_used > self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                self._close(entry.conn)
+                with self._cond:
+                    self._discarded += 1
+                return self._new_entry()
+        return entry
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
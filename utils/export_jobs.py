@@ -0,0 +1,193 @@
+"""后台导出任务
+
+工作线程把导出文件写入暂存目录，任务状态以 JSON 保存在文件旁边，同一主机上的
+其它工作进程也能查询进度和下载结果。已完成的文件超过保存时间或暂存目录超过
+空间上限时，从最旧的开始删除。
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ExportJob:
+    """导出任务状态"""
+
+    __slots__ = ('id', 'key', 'fmt', 'filename', 'mimetype', 'owners', 'status',
+                 'rows', 'total', 'size', 'error', 'created_at', 'updated_at', 'finished_at')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExportJobRunner:
+    """导出任务执行器
+
+    submit 的 produce(job, fileobj, progress) 负责写入文件，每写入一批行调用
+    progress(已写入行数)。同一进程内参数相同且未完成的任务会被合并。
+    """
+
+    def __init__(self, spool_dir, workers=2, max_bytes=1024 ** 3, max_age=3600, progress_interval=1.0):
+        self.spool_dir = os.path.abspath(spool_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.progress_interval = progress_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fmt, filename, mimetype, owner, total, produce):
+        """提交导出任务，返回任务（参数相同的未完成任务直接复用）"""
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                if owner not in job.owners:
+                    job.owners.append(owner)
+                    self._save(job)
+                return job
+
+            now = time.time()
+            job = ExportJob(id=uuid.uuid4().hex, key=key, fmt=fmt, filename=filename, mimetype=mimetype,
+                            owners=[owner], status='queued', rows=0, total=total, size=0,
+                            created_at=now, updated_at=now)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._save(job)
+
+        self.cleanup()
+        self._executor.submit(self._run, job, produce)
+        return job
+
+    def get(self, job_id):
+        """查询任务（本进程的任务直接返回，否则读取暂存目录中的状态文件）"""
+        if not job_id or not _JOB_ID.match(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self._meta_path(job_id), encoding='utf-8') as f:
+                return ExportJob(**json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def file_path(self, job):
+        """任务结果文件路径"""
+        return os.path.join(self.spool_dir, f'{job.id}.{job.fmt}')
+
+    def cleanup(self):
+        """删除过期的任务文件；暂存目录超过空间上限时从最旧的已完成任务开始删除"""
+        now = time.time()
+        finished = []
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            job = self.get(name[:-5])
+            if job is None:
+                continue
+            with self._lock:
+                running_here = job.id in self._jobs and not job.finished
+            if running_here:
+                continue
+            # 未完成且长时间没有更新的任务视为所在进程已退出
+            if now - (job.finished_at or job.updated_at or 0) > self.max_age:
+                self._remove(job)
+            elif job.finished:
+                finished.append(job)
+
+        used = sum(job.size or 0 for job in finished)
+        for job in sorted(finished, key=lambda job: job.finished_at):
+            if used <= self.max_bytes:
+                break
+            used -= job.size or 0
+            self._remove(job)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': sum(1 for job in self._active.values() if job.status == 'queued'),
+                'running': sum(1 for job in self._active.values() if job.status == 'running'),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, produce):
+        path = self.file_path(job)
+        partial = path + '.part'
+        last_saved = [time.monotonic()]
+
+        def progress(rows):
+            job.rows = rows
+            if time.monotonic() - last_saved[0] >= self.progress_interval:
+                last_saved[0] = time.monotonic()
+                job.updated_at = time.time()
+                self._save(job)
+
+        job.status = 'running'
+        job.updated_at = time.time()
+        self._save(job)
+        try:
+            with open(partial, 'wb') as f:
+                produce(job, f, progress)
+            os.replace(partial, path)
+            job.size = os.path.getsize(path)
+            job.status = 'done'
+        except Exception as e:
+            logger.exception('导出任务 %s 失败', job.id)
+            job.status = 'failed'
+            job.error = str(e)
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            job.finished_at = job.updated_at = time.time()
+            with self._lock:
+                self._save(job)
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+        self.cleanup()
+
+    def _remove(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        path = self.file_path(job)
+        for path in (path, path + '.part', self._meta_path(job.id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.spool_dir, f'{job_id}.json')
+
+    def _save(self, job):
+        # 先写临时文件再替换，读取方不会看到写了一半的状态
+        path = self._meta_path(job.id)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
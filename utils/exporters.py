@@ -0,0 +1,127 @@
+"""导出文件写入工具（按块写入，内存占用与记录总数无关）"""
+import csv
+import importlib.util
+import io
+from datetime import timedelta
+
+# 导出列（与 EmojiRecord.export_records 的查询字段一致）
+EXPORT_COLUMNS = ['course_name', 'course_code', 'emoji', 'emoji_name',
+                  'session_date', 'session_time', 'comment', 'created_at']
+
+# 支持的导出格式：格式 -> (MIME类型, 扩展名)
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Parquet 每个行组的行数（行组是列式读取与压缩的基本单位）
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# 取值重复度高的列使用字典编码
+PARQUET_DICTIONARY_COLUMNS = ('course_name', 'course_code', 'emoji', 'emoji_name')
+
+
+def format_value(value):
+    """将数据库值转换为导出值（TIME 字段在 PyMySQL 中为 timedelta）"""
+    if value is None:
+        return ''
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{(seconds // 60) % 60:02d}:{seconds % 60:02d}"
+    return value
+
+
+def iter_csv(chunks):
+    """逐块生成 CSV 字节流（带 BOM，Excel 可直接打开中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([format_value(row[col]) for col in EXPORT_COLUMNS])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx(chunks, fileobj):
+    """以 openpyxl 只写模式写入 XLSX（行数据直接落盘，不在内存中保留工作表）"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('表情数据')
+    sheet.append(EXPORT_COLUMNS)
+    for rows in chunks:
+        for row in rows:
+            sheet.append([format_value(row[col]) for col in EXPORT_COLUMNS])
+    workbook.save(fileobj)
+
+
+def parquet_available():
+    """是否已安装 Parquet 导出所需的 pyarrow"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _parquet_schema(pa):
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('course_name', dictionary),
+        ('course_code', dictionary),
+        ('emoji', dictionary),
+        ('emoji_name', dictionary),
+        ('session_date', pa.date32()),
+        ('session_time', pa.time32('s')),
+        ('comment', pa.string()),
+        ('created_at', pa.timestamp('s')),
+    ])
+
+
+def _parquet_table(pa, schema, rows):
+    columns = []
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if field.name == 'session_time':
+            # TIME 字段在 PyMySQL 中为 timedelta，转换为当天的秒数
+            values = [None if value is None else int(value.total_seconds()) for value in values]
+        if field.name in PARQUET_DICTIONARY_COLUMNS:
+            columns.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_parquet(chunks, fileobj, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """写入 Parquet：按行组累积记录后写出，日期、时间列使用原生类型"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet 导出需要 pyarrow 包，请执行: pip install pyarrow')
+
+    schema = _parquet_schema(pa)
+    with pq.ParquetWriter(fileobj, schema, compression='zstd',
+                          use_dictionary=list(PARQUET_DICTIONARY_COLUMNS)) as writer:
+        pending = []
+        for rows in chunks:
+            pending.extend(rows)
+            if len(pending) >= row_group_size:
+                writer.write_table(_parquet_table(pa, schema, pending[:row_group_size]))
+                del pending[:row_group_size]
+        if pending:
+            writer.write_table(_parquet_table(pa, schema, pending))
+
+
+def write_export(fmt, chunks, fileobj):
+    """按格式把分块记录写入二进制文件对象"""
+    if fmt == 'csv':
+        for block in iter_csv(chunks):
+            fileobj.write(block)
+    elif fmt == 'parquet':
+        write_parquet(chunks, fileobj)
+    else:
+        write_xlsx(chunks, fileobj)
@@ -0,0 +1,61 @@
+"""HTTP 条件请求（ETag / Last-Modified）与短期响应缓存"""
+import hashlib
+from datetime import datetime, time, timezone
+
+from flask import Response, request
+
+from utils.cache import TTLCache
+
+
+def make_etag(*parts):
+    """由各组成部分（数据版本、查询参数、可见范围等）计算强 ETag 值"""
+    raw = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def window_last_modified(updated_at, today):
+    """统计窗口随日期滚动，最后修改时间不早于当天零点"""
+    midnight = datetime.combine(today, time()).astimezone(timezone.utc)
+    if updated_at is None or updated_at < midnight:
+        return midnight
+    return updated_at
+
+
+def is_not_modified(etag, last_modified):
+    """判断客户端缓存是否仍然有效（有 If-None-Match 时忽略 If-Modified-Since）"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+class ConditionalCache:
+    """按 ETag 缓存响应体
+
+    ETag 已包含数据版本，数据变化后旧条目自然不再命中，无需主动失效；
+    ttl 只限制页面中其它内容（教师姓名等）的陈旧时间。
+    """
+
+    def __init__(self, maxsize=256, ttl=5):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, namespace='response')
+
+    def respond(self, etag, last_modified, build, mimetype='text/html'):
+        """返回 304，或返回缓存/新生成的响应体；build() 生成响应体（str 或 bytes）"""
+        if is_not_modified(etag, last_modified):
+            response = Response(status=304)
+        else:
+            body = self.cache.get(etag)
+            if body is None:
+                body = build()
+                self.cache.set(etag, body)
+            response = Response(body, mimetype=mimetype)
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        # 允许浏览器保存，但每次使用前都须重新验证
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,45 @@
+"""表单提交幂等令牌（吸收重复点击和浏览器重试）"""
+import secrets
+
+from utils.cache import TTLCache
+
+# 首次提交仍在处理中（尚无结果）
+PENDING = 'pending'
+
+
+class SubmissionTokens:
+    """表单提交令牌
+
+    GET 渲染表单时 issue 生成令牌放入隐藏字段；POST 时 begin 原子地占用令牌，
+    首次提交返回 None 并继续处理，处理完成后 finish 保存结果。同一令牌再次提交时
+    begin 直接返回保存的结果（仍在处理中时为 PENDING），调用方据此响应而不访问数据库。
+    令牌按用户区分，保存 ttl 秒；设置 backend 后各进程共享，令牌状态只以共享缓存为准，
+    避免其它进程 finish/release 之后本进程仍按进程内的 PENDING 副本响应。
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, backend=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, namespace='submission_tokens', backend=backend)
+
+    @staticmethod
+    def issue():
+        """生成新令牌"""
+        return secrets.token_urlsafe(16)
+
+    def begin(self, owner, token):
+        """占用令牌：首次提交（或未携带令牌）返回 None，重复提交返回此前的结果或 PENDING"""
+        if not token:
+            return None
+        key = f'{owner}:{token}'
+        if self.cache.add(key, PENDING):
+            return None
+        return self.cache.get(key, PENDING, local=False)
+
+    def finish(self, owner, token, outcome):
+        """保存首次提交的结果"""
+        if token:
+            self.cache.set(f'{owner}:{token}', outcome)
+
+    def release(self, owner, token):
+        """处理失败时释放令牌，允许重试"""
+        if token:
+            self.cache.delete(f'{owner}:{token}')
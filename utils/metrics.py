@@ -0,0 +1,240 @@
+"""Prometheus 文本格式指标
+
+采集端只做预聚合（计数器累加、直方图分桶计数），每次记录只需一次加锁的字典操作；
+进程级状态（连接池、缓存、队列等）在抓取 /metrics 时通过回调读取。
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, current_app, g, request
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _label_key(values):
+    # 标签值统一转为字符串，避免 3 与 '3' 输出为两条相同的序列（Prometheus 会拒绝整次抓取）
+    return tuple(str(value) for value in values)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        label_values = _label_key(label_values)
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labels, values), value) for values, value in items]
+
+
+class Histogram:
+    """分桶直方图（只保存各桶计数、总和与总数）"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        label_values = _label_key(label_values)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(values, (list(state[0]), state[1], state[2])) for values, state in self._values.items()]
+        samples = []
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((self.name + '_bucket', _format_labels(self.labels, values, le), cumulative))
+            samples.append((self.name + '_sum', _format_labels(self.labels, values), total))
+            samples.append((self.name + '_count', _format_labels(self.labels, values), count))
+        return samples
+
+
+class CallbackGauge:
+    """抓取时由回调计算的指标；回调返回数值或 {标签值元组: 数值}"""
+
+    def __init__(self, name, documentation, callback, labels=(), type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labels = tuple(labels)
+        self.type = type
+
+    def samples(self):
+        value = self.callback()
+        if not isinstance(value, dict):
+            return [(self.name, '', value)]
+        return [(self.name, _format_labels(self.labels, values), v) for values, v in value.items()]
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, callback, labels=(), type='gauge'):
+        return self.register(CallbackGauge(name, documentation, callback, labels, type))
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in samples:
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class ActiveSessions:
+    """最近活跃的登录用户（按角色统计）"""
+
+    def __init__(self, window=300):
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def touch(self, user_id, role):
+        self._seen[user_id] = (role, time.monotonic())
+
+    def counts(self):
+        cutoff = time.monotonic() - self.window
+        counts = {}
+        with self._lock:
+            for user_id, (role, seen) in list(self._seen.items()):
+                if seen < cutoff:
+                    self._seen.pop(user_id, None)
+                else:
+                    counts[(role,)] = counts.get((role,), 0) + 1
+        return counts
+
+
+# 应用指标
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'HTTP 请求耗时', ('endpoint', 'method'))
+REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP 请求数', ('endpoint', 'method', 'status'))
+DB_QUERIES = registry.counter(
+    'db_queries_total', '数据库查询次数', ('endpoint', 'operation'))
+DB_QUERY_LATENCY = registry.histogram(
+    'db_query_duration_seconds', '数据库查询耗时', ('operation',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+EMOJI_SUBMISSIONS = registry.counter(
+    'emoji_submissions_total', '表情提交数', ('course_id',))
+EMOJI_DUPLICATES = registry.counter(
+    'emoji_duplicate_submissions_total', '因重复而被忽略的表情提交数', ('source',))
+EXPORT_DURATION = registry.histogram(
+    'export_duration_seconds', '数据导出耗时', ('format',),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+EXPORT_BYTES = registry.counter(
+    'export_bytes_total', '数据导出字节数', ('format',))
+
+active_sessions = ActiveSessions()
+registry.gauge('active_sessions', '最近 5 分钟内活跃的登录用户数', active_sessions.counts, ('role',))
+
+
+def observe_query(query, duration, rows):
+    """SQL 查询埋点回调（由 Profiler 调用）"""
+    operation = query.lstrip()[:6].upper()
+    endpoint = request.endpoint if request else 'background'
+    DB_QUERIES.inc(endpoint or 'unknown', operation)
+    DB_QUERY_LATENCY.observe(duration, operation)
+
+
+def observe_export(fmt, size, duration):
+    """记录一次导出的文件大小与耗时"""
+    EXPORT_BYTES.inc(fmt, amount=size)
+    EXPORT_DURATION.observe(duration, fmt)
+
+
+def init_app(app):
+    """注册请求计时钩子与 /metrics 端点"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unknown'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+            REQUESTS.inc(endpoint, request.method, str(response.status_code))
+        # 只统计本请求已加载的用户，不为统计额外触发用户加载
+        user = g.get('_login_user')
+        if user is not None and user.is_authenticated:
+            active_sessions.touch(user.id, user.role)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus 指标"""
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,72 @@
+"""数据库版本迁移
+
+迁移文件位于 database/migrations，命名为 <版本号>_<说明>.sql（如 002_covering_indexes.sql），
+按版本号顺序执行，已执行的版本记录在 schema_migrations 表中。
+MySQL 的 DDL 会隐式提交，因此每个迁移文件应尽量只做一件事。
+"""
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'database', 'migrations')
+
+_FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """读取迁移文件列表，返回按版本号排序的 [(版本号, 说明, 路径)]"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append((match.group(1), match.group(2), os.path.join(directory, filename)))
+    return sorted(migrations, key=lambda item: int(item[0]))
+
+
+def split_statements(sql):
+    """去掉 -- 注释行后按分号拆分SQL语句"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [stmt.strip() for stmt in '\n'.join(lines).split(';') if stmt.strip()]
+
+
+def applied_versions(conn):
+    """已执行的迁移版本号集合（必要时创建 schema_migrations 表）"""
+    cursor = conn.cursor()
+    cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                          version VARCHAR(50) PRIMARY KEY,
+                          name VARCHAR(255) NOT NULL,
+                          applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                      ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci""")
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row['version'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def pending_migrations(conn, directory=MIGRATIONS_DIR):
+    """尚未执行的迁移"""
+    applied = applied_versions(conn)
+    return [item for item in load_migrations(directory) if item[0] not in applied]
+
+
+def migrate(conn, directory=MIGRATIONS_DIR, log=print):
+    """按顺序执行所有未执行的迁移，返回本次执行的版本号列表"""
+    done = []
+    for version, name, path in pending_migrations(conn, directory):
+        log(f'执行迁移 {version}_{name} ...')
+        with open(path, encoding='utf-8') as f:
+            statements = split_statements(f.read())
+
+        cursor = conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        done.append(version)
+    return done
@@ -0,0 +1,54 @@
+"""键集（keyset）分页工具
+
+分页游标记录上一页最后一行的排序键，下一页通过 WHERE 条件直接定位，
+无论翻到多深，每页的查询代价都相同（不使用 OFFSET）。
+"""
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+
+def _encode_value(value):
+    """将排序键的值转换为可直接用作 SQL 参数的字符串"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{(seconds // 60) % 60:02d}:{seconds % 60:02d}"
+    return value
+
+
+def encode_cursor(values):
+    """将排序键编码为 URL 安全的游标字符串"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """解码游标；无效或长度不符时返回 None（视为第一页）"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+def paginate(records, page_size, key_fields):
+    """截取一页记录并生成下一页游标
+
+    调用方应查询 page_size + 1 行，多出的一行仅用于判断是否还有下一页。
+    """
+    if len(records) <= page_size:
+        return records, None
+    records = records[:page_size]
+    last = records[-1]
+    return records, encode_cursor([last[field] for field in key_fields])
@@ -0,0 +1,154 @@
+"""密码哈希服务（进程池执行，限制并发）与登录失败限流"""
+import threading
+import time
+from contextlib import contextmanager
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils.cache import TTLCache
+
+
+class HashingBusyError(Exception):
+    """等待哈希计算名额超时"""
+
+
+class PasswordHasher:
+    """密码哈希服务
+
+    scrypt 计算量和内存占用都很大，在请求线程中直接计算会在登录高峰时占满 CPU。
+    哈希在独立的进程池中计算，请求线程只等待结果；同时计算和排队的任务数不超过
+    max_pending，超出时等待 timeout 秒后抛出 HashingBusyError。
+    workers 为 0 时在调用线程中计算（仍受 max_pending 限制）。
+
+    进程池使用 spawn 启动方式，每个工作进程会以 __mp_main__ 重新导入启动脚本；
+    启动脚本在模块级别只应做轻量的导入（见 database/import_roster.py），
+    Web 应用应由 WSGI 服务器加载 app:app 后再设置 workers。
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', workers=0, max_pending=32, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._prefix = None
+
+        # 统计数据
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def hash(self, password):
+        """生成密码哈希"""
+        with self._slot():
+            return self._call(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """批量生成密码哈希
+
+        按进程数分批提交，每个哈希占用一个计算名额，批次之间其它请求的哈希任务可以插入。
+        """
+        hashes = []
+        wave = max(min(self.workers, self.max_pending), 1)
+        for i in range(0, len(passwords), wave):
+            batch = passwords[i:i + wave]
+            with self._slot(len(batch)):
+                if not self.workers:
+                    hashes.extend(generate_password_hash(password, self.method) for password in batch)
+                    continue
+                futures = [self._get_executor().submit(generate_password_hash, password, self.method)
+                           for password in batch]
+                hashes.extend(future.result() for future in futures)
+        return hashes
+
+    def verify(self, password_hash, password):
+        """校验密码"""
+        with self._slot():
+            return self._call(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """哈希参数与当前配置不同时返回 True（登录成功后应重新哈希）"""
+        if self._prefix is None:
+            # 由 werkzeug 规范化方法名（如 scrypt -> scrypt:32768:8:1）
+            self._prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'pending': self._pending, 'rejected': self._rejected}
+
+    @contextmanager
+    def _slot(self, count=1):
+        """占用 count 个计算名额（共等待不超过 timeout 秒）"""
+        deadline = time.monotonic() + self.timeout
+        acquired = 0
+        while acquired < count:
+            if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                for _ in range(acquired):
+                    self._slots.release()
+                with self._lock:
+                    self._rejected += 1
+                raise HashingBusyError('密码哈希任务排队超时')
+            acquired += 1
+        with self._lock:
+            self._pending += count
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= count
+            for _ in range(count):
+                self._slots.release()
+
+    def _call(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        return self._get_executor().submit(fn, *args).result()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # workers 为 0 时不需要进程池，首次使用时再导入 multiprocessing
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # 应用进程中已有后台线程，使用 spawn 避免 fork 带入其它线程持有的锁
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+
+class LoginThrottle:
+    """按用户名限制登录失败次数
+
+    window 秒内失败 max_failures 次后拒绝该用户名继续尝试（不再计算密码哈希），
+    每次失败都会重新开始计时，登录成功后清零。设置 backend 后各进程共享计数。
+    """
+
+    def __init__(self, max_failures=5, window=300, maxsize=10000, backend=None):
+        self.max_failures = max_failures
+        self.cache = TTLCache(maxsize=maxsize, ttl=window, namespace='login_failures', backend=backend)
+
+    @staticmethod
+    def _key(username):
+        # 用户名列的排序规则不区分大小写
+        return (username or '').strip().lower()
+
+    def is_blocked(self, username):
+        return self.cache.get(self._key(username), 0) >= self.max_failures
+
+    def record_failure(self, username):
+        key = self._key(username)
+        self.cache.set(key, self.cache.get(key, 0) + 1)
+
+    def reset(self, username):
+        self.cache.delete(self._key(username))
@@ -0,0 +1,218 @@
+"""请求级性能剖析与SQL查询埋点
+
+- 记录每条SQL的指纹、耗时、返回行数，按请求汇总，并按端点累计查询次数与耗时
+- 记录模板渲染耗时
+- 调试模式（或 SERVER_TIMING=True）下通过 Server-Timing 响应头输出
+- 超过 SLOW_QUERY_THRESHOLD_MS 的查询写入慢查询日志
+- PROFILE_SAMPLE_RATE > 0 时按比例对请求做 cProfile 采样，结果保存到 PROFILE_DIR
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from flask import before_render_template, current_app, g, request, template_rendered
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('emoji_checker.slow_query')
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_REPEATED_TUPLES = re.compile(r'(\([?, ]+\))(?:\s*,\s*\([?, ]+\))+')
+_IN_LIST = re.compile(r'IN \(\?(?:, \?)+\)', re.IGNORECASE)
+
+# 同一请求内同一指纹的查询超过该次数时提示可能存在 N+1 查询
+N_PLUS_ONE_THRESHOLD = 10
+
+
+def fingerprint(sql):
+    """SQL 指纹：去掉字面量和多余空白，合并多行 VALUES 与 IN 列表"""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _REPEATED_TUPLES.sub(r'\1, ...', sql)
+    return _IN_LIST.sub('IN (?, ...)', sql)
+
+
+class RequestProfile:
+    """单个请求的剖析数据"""
+
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', '_template_started', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_started = None
+        self.profiler = None
+
+
+class _ProfiledCursor:
+    """记录 execute/executemany 耗时的游标代理"""
+
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._owner.record(query, time.perf_counter() - start, self._cursor.rowcount)
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._owner.record(query, time.perf_counter() - start, self._cursor.rowcount)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _ProfiledConnection:
+    """返回埋点游标的连接代理"""
+
+    def __init__(self, conn, owner):
+        self._conn = conn
+        self._owner = owner
+
+    def cursor(self, *args, **kwargs):
+        return _ProfiledCursor(self._conn.cursor(*args, **kwargs), self._owner)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class Profiler:
+    """请求剖析器"""
+
+    def __init__(self, app=None):
+        self.slow_query_threshold = 0.2
+        self.sample_rate = 0.0
+        self.profile_dir = None
+        self.server_timing = None
+
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+        # 查询回调 fn(query, duration, rows)，如指标采集
+        self.query_listeners = []
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """注册请求钩子并读取配置"""
+        self.slow_query_threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.profile_dir = app.config.get('PROFILE_DIR')
+        self.server_timing = app.config.get('SERVER_TIMING')
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def wrap(self, conn):
+        """为数据库连接加上查询埋点"""
+        return _ProfiledConnection(conn, self)
+
+    def record(self, query, duration, rows):
+        """记录一条查询"""
+        profile = g.get('profile') if g else None
+        if profile is not None:
+            profile.queries.append((query, duration, rows))
+            profile.db_time += duration
+
+        for listener in self.query_listeners:
+            listener(query, duration, rows)
+
+        if duration >= self.slow_query_threshold:
+            endpoint = request.endpoint if request else None
+            slow_query_logger.warning('慢查询 %.1fms rows=%s endpoint=%s: %s',
+                                      duration * 1000, rows, endpoint, fingerprint(query))
+
+    def endpoint_stats(self):
+        """按端点汇总的请求数、查询数及耗时"""
+        with self._lock:
+            return {
+                endpoint: dict(stats,
+                               avg_queries=round(stats['queries'] / stats['requests'], 2),
+                               avg_time_ms=round(stats['total_time'] / stats['requests'] * 1000, 2))
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def _before_request(self):
+        g.profile = RequestProfile()
+        if self.sample_rate and self.profile_dir and random.random() < self.sample_rate:
+            g.profile.profiler = cProfile.Profile()
+            g.profile.profiler.enable()
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = g.get('profile')
+        if profile is not None:
+            profile._template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = g.get('profile')
+        if profile is not None and profile._template_started is not None:
+            profile.template_time += time.perf_counter() - profile._template_started
+            profile._template_started = None
+
+    def _after_request(self, response):
+        profile = g.get('profile')
+        if profile is None:
+            return response
+        total = time.perf_counter() - profile.started
+        endpoint = request.endpoint or 'unknown'
+
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            self._dump_profile(profile.profiler, endpoint)
+
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'db_time': 0.0, 'template_time': 0.0, 'total_time': 0.0})
+            stats['requests'] += 1
+            stats['queries'] += len(profile.queries)
+            stats['db_time'] += profile.db_time
+            stats['template_time'] += profile.template_time
+            stats['total_time'] += total
+
+        self._check_n_plus_one(profile, endpoint)
+
+        server_timing = self.server_timing if self.server_timing is not None else current_app.debug
+        if server_timing:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={profile.db_time * 1000:.2f};desc="{len(profile.queries)} queries"',
+                f'tpl;dur={profile.template_time * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ])
+        return response
+
+    def _check_n_plus_one(self, profile, endpoint):
+        counts = {}
+        for query, _, _ in profile.queries:
+            counts[query] = counts.get(query, 0) + 1
+        for query, count in counts.items():
+            if count >= N_PLUS_ONE_THRESHOLD:
+                logger.warning('端点 %s 单次请求执行同一查询 %d 次，可能存在 N+1 查询: %s',
+                               endpoint, count, fingerprint(query))
+
+    def _dump_profile(self, profiler, endpoint):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        filename = f"{endpoint.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{threading.get_ident()}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
@@ -0,0 +1,157 @@
+"""进程内发布/订阅，可选通过消息代理在多个工作进程间转发"""
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """订阅者的消息队列（有界，消费过慢时丢弃最旧的消息）"""
+
+    def __init__(self, hub, channel, max_pending):
+        self.hub = hub
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def put(self, message):
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """等待下一条消息，超时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class LocalBroker:
+    """消息代理的本地替身
+
+    接口与 RedisBroker 一致；多个 PubSub 共享同一个 LocalBroker 时即模拟多进程转发。
+    """
+
+    def __init__(self):
+        self._handlers = []
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            handler(channel, payload)
+
+    def listen(self, handler):
+        with self._lock:
+            self._handlers.append(handler)
+
+
+class RedisBroker:
+    """基于 Redis PUBLISH/PSUBSCRIBE 的消息代理"""
+
+    def __init__(self, client, prefix='emoji_checker:'):
+        self._client = client
+        self._prefix = prefix
+
+    def publish(self, channel, payload):
+        self._client.publish(self._prefix + channel, payload)
+
+    def listen(self, handler):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self._prefix + '*')
+
+        def run():
+            for message in pubsub.listen():
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode('utf-8')
+                handler(channel[len(self._prefix):], message['data'])
+
+        threading.Thread(target=run, name='pubsub-listener', daemon=True).start()
+
+
+def create_broker(url):
+    """根据配置创建消息代理；未配置时返回 None（仅在本进程内分发）"""
+    if not url:
+        return None
+    if url == 'local://':
+        return LocalBroker()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('PUBSUB_BROKER_URL 需要 redis 包，请执行: pip install redis')
+    return RedisBroker(redis.Redis.from_url(url))
+
+
+class PubSub:
+    """按频道向本进程内的订阅者分发消息
+
+    设置 broker 后，publish 只发送到代理，由代理回传给每个进程再在本地分发。
+    """
+
+    def __init__(self, broker=None, max_pending=100):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._broker = None
+        if broker is not None:
+            self.attach_broker(broker)
+
+    def attach_broker(self, broker):
+        """接入消息代理"""
+        self._broker = broker
+        broker.listen(self._on_broker_message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        """发布消息（message 需可 JSON 序列化）"""
+        if self._broker is not None:
+            try:
+                self._broker.publish(channel, json.dumps(message, ensure_ascii=False))
+                return
+            except Exception:
+                logger.warning('消息代理发布失败，改为仅在本进程内分发', exc_info=True)
+        self._deliver(channel, message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _on_broker_message(self, channel, payload):
+        try:
+            self._deliver(channel, json.loads(payload))
+        except ValueError:
+            logger.warning('无法解析的消息: %r', payload)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
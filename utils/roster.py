@@ -0,0 +1,95 @@
+"""名单文件（CSV/XLSX）逐行读取"""
+import csv
+import io
+import re
+import zipfile
+from xml.etree.ElementTree import ParseError
+
+# 表头别名 -> 字段名（不区分大小写）
+ROSTER_HEADERS = {
+    'username': 'username', '用户名': 'username', '学号': 'username',
+    'password': 'password', '密码': 'password',
+    'full_name': 'full_name', 'name': 'full_name', '姓名': 'full_name',
+    'email': 'email', '邮箱': 'email',
+    'role': 'role', '角色': 'role',
+    'course_codes': 'course_codes', 'course_code': 'course_codes', 'courses': 'course_codes',
+    '课程代码': 'course_codes',
+}
+
+ROSTER_FORMATS = ('csv', 'xlsx')
+
+_CODE_SEPARATOR = re.compile(r'[\s,;，；]+')
+
+
+def split_course_codes(value):
+    """拆分课程代码列（逗号、分号或空白分隔）"""
+    return [code for code in _CODE_SEPARATOR.split(value or '') if code]
+
+
+def _normalize_header(header):
+    fields = []
+    for name in header:
+        key = str(name).strip().lower() if name is not None else ''
+        fields.append(ROSTER_HEADERS.get(key))
+    if 'username' not in fields:
+        raise ValueError('名单缺少用户名列（username / 用户名）')
+    return fields
+
+
+def _to_row(fields, values):
+    row = {}
+    for field, value in zip(fields, values):
+        if field is None or value is None:
+            continue
+        value = str(value).strip()
+        if value:
+            row[field] = value
+    return row
+
+
+def iter_csv_rows(fileobj):
+    """逐行读取 CSV（二进制文件对象，UTF-8，可带 BOM），产出 (行号, 字段字典)"""
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    try:
+        fields = _normalize_header(next(reader, []))
+        for values in reader:
+            row = _to_row(fields, values)
+            if row:
+                yield reader.line_num, row
+    except csv.Error as e:
+        raise ValueError(f'CSV 格式错误（第 {reader.line_num} 行）：{e}') from e
+
+
+def iter_xlsx_rows(fileobj):
+    """逐行读取 XLSX 第一个工作表（只读模式），产出 (行号, 字段字典)
+
+    文件损坏或不是 XLSX（非 zip、缺少工作簿部件、XML 无法解析）时抛出 ValueError。
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, ParseError) as e:
+        raise ValueError('无法读取 XLSX 文件，请确认文件未损坏且为 Excel 工作簿') from e
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        fields = _normalize_header(next(rows, ()))
+        for line, values in enumerate(rows, start=2):
+            row = _to_row(fields, values)
+            if row:
+                yield line, row
+    except (zipfile.BadZipFile, KeyError, ParseError) as e:
+        raise ValueError('XLSX 工作表内容无法解析') from e
+    finally:
+        workbook.close()
+
+
+def iter_roster(fileobj, filename):
+    """按扩展名选择读取方式"""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext == 'csv':
+        return iter_csv_rows(fileobj)
+    if ext == 'xlsx':
+        return iter_xlsx_rows(fileobj)
+    raise ValueError('仅支持 CSV 或 XLSX 名单文件')
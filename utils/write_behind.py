@@ -0,0 +1,149 @@
+"""后写（write-behind）队列：请求线程只入队，后台线程批量写库"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class QueueFullError(Exception):
+    """队列已满"""
+
+
+class WriteBehindQueue:
+    """有界的后写队列
+
+    - flush_fn(batch): 在后台线程中调用，一次写入一批数据（一个事务）
+    - max_size: 队列容量，满时 put 抛出 QueueFullError，由调用方降级为同步写入
+    - batch_size / flush_interval: 攒满 batch_size 条或距上次写入超过 flush_interval 秒即写入
+    - max_retries: 写入失败后的重试次数，仍失败则记录错误日志并丢弃该批
+    - describe(batch): 丢弃时写入日志的批次摘要；数据可能包含用户提交的内容，
+      日志中不记录数据本身，未提供时只记录条数
+    """
+
+    def __init__(self, flush_fn, max_size=10000, batch_size=200, flush_interval=0.5, max_retries=3,
+                 describe=None):
+        self._flush_fn = flush_fn
+        self._describe = describe
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # 统计数据
+        self._enqueued = 0
+        self._rejected = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._batches = 0
+        self._flush_time_total = 0.0
+        self._flush_time_max = 0.0
+        self._flush_time_last = 0.0
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30):
+        """停止后台线程，写完队列中剩余的数据后返回"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def put(self, item):
+        """入队（不阻塞）"""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError('提交队列已满')
+        with self._lock:
+            self._enqueued += 1
+
+    def stats(self):
+        """队列统计（深度、写入批次、写入耗时等）"""
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'enqueued': self._enqueued,
+                'rejected': self._rejected,
+                'flushed': self._flushed,
+                'dropped': self._dropped,
+                'batches': self._batches,
+                'flush_time_last': round(self._flush_time_last, 6),
+                'flush_time_avg': round(self._flush_time_total / self._batches, 6) if self._batches else 0.0,
+                'flush_time_max': round(self._flush_time_max, 6),
+            }
+
+    def _run(self):
+        stopping = False
+        while True:
+            batch, stopping = self._collect(stopping)
+            if batch:
+                self._flush(batch)
+            if stopping and self._queue.empty():
+                return
+
+    def _summary(self, batch):
+        if self._describe is None:
+            return ''
+        try:
+            return f'（{self._describe(batch)}）'
+        except Exception:
+            return ''
+
+    def _collect(self, stopping):
+        """取出一批数据；收到停止信号后不再等待，直接取完队列"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if stopping:
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopping = True
+                continue
+            batch.append(item)
+        return batch, stopping
+
+    def _flush(self, batch):
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            try:
+                self._flush_fn(batch)
+            except Exception:
+                if attempt < self.max_retries:
+                    logger.warning('批量写入失败，%s 条数据将重试（第 %d 次）', len(batch), attempt + 1, exc_info=True)
+                    time.sleep(min(2 ** attempt * 0.1, 2))
+                    continue
+                logger.error('批量写入失败，丢弃 %s 条数据%s', len(batch), self._summary(batch), exc_info=True)
+                with self._lock:
+                    self._dropped += len(batch)
+                return
+
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._flushed += len(batch)
+                self._batches += 1
+                self._flush_time_last = elapsed
+                self._flush_time_total += elapsed
+                self._flush_time_max = max(self._flush_time_max, elapsed)
+            return